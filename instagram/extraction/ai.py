@@ -5,32 +5,216 @@ Fetches Instagram post data from Supabase and extracts event information using G
 """
 
 import os
-import json
+import orjson
 import sys
+import logging
+import logging.handlers
+import queue
+import asyncio
+import aiohttp
+import httpx
 import base64
+import hashlib
 import time
+from io import BytesIO
 import threading
-from collections import deque
+import functools
+import contextlib
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
 from supabase import create_client, Client
-from groq import Groq
+from postgrest.exceptions import APIError
+from postgrest.types import ReturnMethod
+from groq import AsyncGroq
+from PIL import Image
+import tiktoken
 from dotenv import load_dotenv
 import string
-from datetime import datetime, timezone, timedelta
+import re
+from datetime import date, datetime, timezone, timedelta
 from dateutil import parser as date_parser
 import psycopg2
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+def start_log_listener(level: str) -> logging.handlers.QueueListener:
+    """
+    Route log records through a queue so callers never block on stdout; a background thread does the writes.
+    Returns the started listener - stop() it at exit to flush.
+    """
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(logging.Formatter('%(message)s'))
+    listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    listener.start()
+    return listener
+
+def parse_datetime(value: str) -> datetime:
+    """
+    Parse a timestamp, using the fast stdlib ISO-8601 parser first and dateutil only for other formats.
+    datetime.fromisoformat is implemented in C, so this is the ciso8601-style fast path without the extra dependency.
+    """
+    try:
+        # Only allocate a new string for the trailing 'Z' (UTC) suffix older Pythons don't accept
+        return datetime.fromisoformat(value[:-1] + '+00:00' if value.endswith('Z') else value)
+    except ValueError:
+        return date_parser.parse(value)
+
+_JSON_FENCE_RE = re.compile(r'^\s*```(?:json)?\s*(.*?)\s*```\s*$', re.DOTALL)
+_JSON_OBJECT_RE = re.compile(r'\{.*\}', re.DOTALL)
+
+def parse_json_response(text: str) -> Any:
+    """
+    Parse model output as JSON, tolerating a ```json fence or prose around the object.
+    Cheaper than retrying the Groq request over a formatting slip; raises orjson.JSONDecodeError if nothing parses.
+    """
+    try:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
+        fenced = _JSON_FENCE_RE.match(text)
+        if fenced:
+            return orjson.loads(fenced.group(1))
+        # Outermost {...} in mixed text
+        embedded = _JSON_OBJECT_RE.search(text)
+        if embedded:
+            return orjson.loads(embedded.group())
+        raise
+
+# Shared pool for blocking Supabase Storage downloads (captions, bios, post images). Every worker goes through the
+# extractor's one Storage client, so downloads reuse its pooled keep-alive connections rather than opening their own
+_io_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='storage-io')
+
+# Separate pool for blocking Supabase table calls so inserts never queue behind storage downloads
+_db_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='supabase-db')
+
+async def run_blocking(func, *args):
+    """Run a blocking Supabase call on _db_pool without blocking the event loop."""
+    return await asyncio.get_running_loop().run_in_executor(_db_pool, functools.partial(func, *args))
+
+class SlidingWindowCounter:
+    """
+    Fixed-memory sliding window made of `num_buckets` buckets of `bucket_seconds` each.
+    Tracks request count and tokens per bucket, plus running totals so reads are O(1).
+    """
+    
+    def __init__(self, num_buckets: int, bucket_seconds: int):
+        self.num_buckets = num_buckets
+        self.bucket_seconds = bucket_seconds
+        self.counts = [0] * num_buckets
+        self.tokens = [0] * num_buckets
+        self.total_count = 0
+        self.total_tokens = 0
+        self._newest_slot = None  # Absolute slot (timestamp // bucket_seconds) of the newest bucket
+        self._oldest_slot = None  # Absolute slot of the oldest non-empty bucket, None when the window is empty
+    
+    def _slot(self, timestamp: float) -> int:
+        return int(timestamp // self.bucket_seconds)
+    
+    def advance(self, current_time: float):
+        """Zero out buckets that have slid out of the window since the last call."""
+        slot = self._slot(current_time)
+        if self._newest_slot is None:
+            self._newest_slot = slot
+            return
+        if slot <= self._newest_slot:
+            return
+        steps = min(slot - self._newest_slot, self.num_buckets)
+        for expired_slot in range(self._newest_slot + 1, self._newest_slot + 1 + steps):
+            i = expired_slot % self.num_buckets
+            self.total_count -= self.counts[i]
+            self.total_tokens -= self.tokens[i]
+            self.counts[i] = 0
+            self.tokens[i] = 0
+        self._newest_slot = slot
+        
+        # Move the oldest pointer forward past expired/empty buckets; it only ever moves forward
+        if self._oldest_slot is not None and self._oldest_slot <= slot - self.num_buckets:
+            self._oldest_slot = next(
+                (candidate for candidate in range(slot - self.num_buckets + 1, slot + 1)
+                 if self.counts[candidate % self.num_buckets] or self.tokens[candidate % self.num_buckets]),
+                None
+            )
+    
+    def add(self, current_time: float, tokens: int, count: int = 1):
+        """Record `count` requests using `tokens` tokens at `current_time`."""
+        self.advance(current_time)
+        i = self._slot(current_time) % self.num_buckets
+        self.counts[i] += count
+        self.tokens[i] += tokens
+        self.total_count += count
+        self.total_tokens += tokens
+        if self._oldest_slot is None:
+            self._oldest_slot = self._slot(current_time)
+    
+    def adjust_tokens(self, timestamp: float, delta: int):
+        """Correct the tokens recorded at `timestamp`, if that bucket is still inside the window."""
+        slot = self._slot(timestamp)
+        if self._newest_slot is None or slot <= self._newest_slot - self.num_buckets:
+            return
+        i = slot % self.num_buckets
+        self.tokens[i] += delta
+        self.total_tokens += delta
+    
+    def oldest_bucket_start(self) -> Optional[float]:
+        """Start time of the oldest non-empty bucket, or None if the window is empty. O(1)."""
+        if self._oldest_slot is None:
+            return None
+        return self._oldest_slot * self.bucket_seconds
+    
+    @property
+    def window_seconds(self) -> int:
+        return self.num_buckets * self.bucket_seconds
+    
+    def clear(self):
+        self.counts = [0] * self.num_buckets
+        self.tokens = [0] * self.num_buckets
+        self.total_count = 0
+        self.total_tokens = 0
+        self._newest_slot = None
+        self._oldest_slot = None
+
+
 class GroqRateLimiter:
     """
     Rate limiter for Groq API calls with RPM, RPD, and TPM tracking.
     Enforces 90% safety thresholds and handles 429 responses.
     """
     
-    def __init__(self):
+    # Token estimation defaults; override per model with the model_config constructor argument
+    DEFAULT_MODEL_CONFIG = {
+        'image_tokens': 800,      # Per-image vision token cost
+        'response_buffer': 1000,  # Buffer for response tokens (conservative estimate)
+        'chars_per_token': 4,     # Rough estimation for text when no tokenizer is available
+    }
+    
+    def __init__(self, tokenizer=None, model_config: Optional[Dict[str, float]] = None):
+        """
+        Args:
+            tokenizer: Optional BPE tokenizer (e.g. a tiktoken Encoding) used to count text tokens.
+                       Falls back to the characters-per-token heuristic when None.
+            model_config: Overrides for DEFAULT_MODEL_CONFIG ('image_tokens', 'response_buffer', 'chars_per_token').
+        """
+        self.tokenizer = tokenizer
+        
+        # Bind the estimation constants and the text counter once so _estimate_tokens has no branches or lookups
+        config = {**self.DEFAULT_MODEL_CONFIG, **(model_config or {})}
+        self._image_tokens = config['image_tokens']
+        self._response_buffer = config['response_buffer']
+        if tokenizer is not None:
+            # encode_ordinary doesn't raise on special-token text appearing in captions
+            encode = tokenizer.encode_ordinary
+            self._count_text_tokens = lambda text: len(encode(text))
+        else:
+            chars_per_token = config['chars_per_token']
+            self._count_text_tokens = lambda text: len(text) / chars_per_token
+        
         # Official Groq limits (as of current knowledge)
         self.OFFICIAL_RPM_LIMIT = 1000
         self.OFFICIAL_RPD_LIMIT = 500000
@@ -41,175 +225,153 @@ class GroqRateLimiter:
         self.RPD_THRESHOLD = int(self.OFFICIAL_RPD_LIMIT * 0.9)  # 450,000
         self.TPM_THRESHOLD = int(self.OFFICIAL_TPM_LIMIT * 0.9)  # 270,000
         
-        # Tracking data structures
-        self.requests_per_minute = deque()  # (timestamp, tokens_used)
-        self.requests_per_day = deque()     # (timestamp, tokens_used)
-        self.tokens_per_minute = deque()    # (timestamp, tokens_used)
+        # Tracking data structures (fixed size regardless of request volume)
+        self.minute_window = SlidingWindowCounter(num_buckets=60, bucket_seconds=1)   # RPM + TPM
+        self.day_window = SlidingWindowCounter(num_buckets=1440, bucket_seconds=60)   # RPD
+        self._last_request = None  # (timestamp, estimated_tokens) of the most recent request
         
         # Thread safety
         self.lock = threading.Lock()
         
-        print(f"🛡️ Groq Rate Limiter initialized:")
-        print(f"   RPM threshold: {self.RPM_THRESHOLD}")
-        print(f"   RPD threshold: {self.RPD_THRESHOLD}")
-        print(f"   TPM threshold: {self.TPM_THRESHOLD}")
+        logger.info(
+            "🛡️ Groq Rate Limiter initialized:\n   RPM threshold: %d\n   RPD threshold: %d\n   TPM threshold: %d",
+            self.RPM_THRESHOLD, self.RPD_THRESHOLD, self.TPM_THRESHOLD
+        )
     
     def _cleanup_old_entries(self, current_time: float):
-        """Remove entries older than their respective time windows."""
-        minute_ago = current_time - 60
-        day_ago = current_time - (24 * 60 * 60)
-        
-        # Clean up requests_per_minute (1 minute window)
-        while self.requests_per_minute and self.requests_per_minute[0][0] < minute_ago:
-            self.requests_per_minute.popleft()
-        
-        # Clean up requests_per_day (24 hour window)
-        while self.requests_per_day and self.requests_per_day[0][0] < day_ago:
-            self.requests_per_day.popleft()
-            
-        # Clean up tokens_per_minute (1 minute window)
-        while self.tokens_per_minute and self.tokens_per_minute[0][0] < minute_ago:
-            self.tokens_per_minute.popleft()
+        """Expire buckets older than their respective time windows."""
+        self.minute_window.advance(current_time)
+        self.day_window.advance(current_time)
     
     def _get_current_usage(self, current_time: float) -> Tuple[int, int, int]:
         """Get current RPM, RPD, and TPM usage."""
         self._cleanup_old_entries(current_time)
         
-        rpm = len(self.requests_per_minute)
-        rpd = len(self.requests_per_day)
-        tpm = sum(entry[1] for entry in self.tokens_per_minute)
+        rpm = self.minute_window.total_count
+        rpd = self.day_window.total_count
+        tpm = self.minute_window.total_tokens
         
         return rpm, rpd, tpm
     
-    def _estimate_tokens(self, messages: List[Dict], model: str) -> int:
+    def _estimate_tokens(self, messages: List[Dict]) -> int:
         """Estimate token usage for a request."""
-        # Rough estimation: 4 characters per token for text
-        total_chars = 0
-        
-        for message in messages:
-            if isinstance(message.get('content'), str):
-                total_chars += len(message['content'])
-            elif isinstance(message.get('content'), list):
-                for content_item in message['content']:
-                    if content_item.get('type') == 'text':
-                        total_chars += len(content_item.get('text', ''))
-                    elif content_item.get('type') == 'image_url':
-                        # Images consume more tokens - rough estimate
-                        total_chars += 1000  # Approximate token cost per image
-        
-        estimated_tokens = total_chars // 4
-        
-        # Add buffer for response tokens (rough estimate)
-        estimated_response_tokens = 1000  # Conservative estimate
-        
-        return estimated_tokens + estimated_response_tokens
+        count_text_tokens = self._count_text_tokens
+        image_tokens = self._image_tokens
+        total_tokens = sum(
+            count_text_tokens(content) if isinstance(content, str)
+            else sum(
+                count_text_tokens(item.get('text', '')) if item.get('type') == 'text'
+                else image_tokens if item.get('type') == 'image_url'
+                else 0
+                for item in content
+            )
+            for content in (message.get('content') for message in messages)
+            if isinstance(content, (str, list))
+        )
+        return int(total_tokens) + self._response_buffer
     
-    def check_and_wait_if_needed(self, messages: List[Dict], model: str) -> bool:
+    async def check_and_wait_if_needed(self, messages: List[Dict], model: str) -> Optional[Tuple[float, int]]:
         """
         Check if request can proceed without hitting rate limits.
         If limits would be exceeded, wait until it's safe to proceed.
-        Returns True if request can proceed, False if should be skipped.
+        Returns the (timestamp, estimated_tokens) reservation if the request can proceed, None if it should be skipped.
+        Pass the reservation to update_actual_usage so concurrent requests correct their own estimates.
         """
-        estimated_tokens = self._estimate_tokens(messages, model)
-        
-        with self.lock:
-            current_time = time.time()
-            rpm, rpd, tpm = self._get_current_usage(current_time)
-            
-            print(f"📊 Current usage: RPM={rpm}/{self.RPM_THRESHOLD}, RPD={rpd}/{self.RPD_THRESHOLD}, TPM={tpm}/{self.TPM_THRESHOLD}")
-            print(f"🔢 Estimated tokens for this request: {estimated_tokens}")
-            
-            # Check if any limits would be exceeded
-            would_exceed_rpm = rpm >= self.RPM_THRESHOLD
-            would_exceed_rpd = rpd >= self.RPD_THRESHOLD
-            would_exceed_tpm = (tpm + estimated_tokens) >= self.TPM_THRESHOLD
-            
-            if would_exceed_rpm or would_exceed_rpd or would_exceed_tpm:
-                exceeded_limits = []
-                if would_exceed_rpm:
-                    exceeded_limits.append(f"RPM ({rpm}/{self.RPM_THRESHOLD})")
-                if would_exceed_rpd:
-                    exceeded_limits.append(f"RPD ({rpd}/{self.RPD_THRESHOLD})")
-                if would_exceed_tpm:
-                    exceeded_limits.append(f"TPM ({tpm + estimated_tokens}/{self.TPM_THRESHOLD})")
-                
-                print(f"🚫 Rate limits would be exceeded: {', '.join(exceeded_limits)}")
+        estimated_tokens = self._estimate_tokens(messages)
+        logger.debug("🔢 Estimated tokens for this request: %d", estimated_tokens)
+        
+        while True:
+            # Only the admission decision and the bookkeeping run under the lock; logging happens after release.
+            # The lock is never held across an await, so it can't stall the event loop.
+            with self.lock:
+                current_time = time.time()
+                rpm, rpd, tpm = self._get_current_usage(current_time)
                 
-                # Calculate wait time based on oldest entry that needs to expire
-                wait_times = []
+                # Check if any limits would be exceeded
+                would_exceed_rpm = rpm >= self.RPM_THRESHOLD
+                would_exceed_rpd = rpd >= self.RPD_THRESHOLD
+                would_exceed_tpm = (tpm + estimated_tokens) >= self.TPM_THRESHOLD
                 
-                if would_exceed_rpm and self.requests_per_minute:
-                    oldest_minute_entry = self.requests_per_minute[0][0]
-                    wait_until_minute = oldest_minute_entry + 60
-                    wait_times.append(wait_until_minute - current_time)
+                max_wait = 0
+                if (would_exceed_rpm or would_exceed_tpm) and not would_exceed_rpd:
+                    # Wait until the oldest bucket expires, then re-check; for TPM that may take a few rounds
+                    oldest_start = self.minute_window.oldest_bucket_start()
+                    if oldest_start is not None:
+                        max_wait = oldest_start + self.minute_window.window_seconds - current_time
                 
-                if would_exceed_tpm and self.tokens_per_minute:
-                    # Find when enough tokens will expire from the minute window
-                    tokens_to_free = (tpm + estimated_tokens) - self.TPM_THRESHOLD + 1
-                    running_tokens = 0
-                    for entry_time, entry_tokens in self.tokens_per_minute:
-                        running_tokens += entry_tokens
-                        if running_tokens >= tokens_to_free:
-                            wait_until_tpm = entry_time + 60
-                            wait_times.append(wait_until_tpm - current_time)
-                            break
-                
-                if would_exceed_rpd:
-                    # For daily limits, we might need to wait up to 24 hours
-                    print("⚠️ Daily request limit reached. Consider reducing batch size or waiting until tomorrow.")
-                    return False
-                
-                if wait_times:
-                    max_wait = max(wait_times)
-                    if max_wait > 0:
-                        print(f"⏳ Waiting {max_wait:.1f} seconds to respect rate limits...")
-                        time.sleep(max_wait + 1)  # Add 1 second buffer
-                        return self.check_and_wait_if_needed(messages, model)  # Recheck after waiting
+                admitted = not would_exceed_rpd and max_wait <= 0
+                if admitted:
+                    # Record the request
+                    self.minute_window.add(current_time, estimated_tokens)
+                    self.day_window.add(current_time, estimated_tokens)
+                    self._last_request = (current_time, estimated_tokens)
             
-            # Record the request
-            self.requests_per_minute.append((current_time, estimated_tokens))
-            self.requests_per_day.append((current_time, estimated_tokens))
-            self.tokens_per_minute.append((current_time, estimated_tokens))
+            logger.debug(
+                "📊 Current usage: RPM=%d/%d, RPD=%d/%d, TPM=%d/%d",
+                rpm, self.RPM_THRESHOLD, rpd, self.RPD_THRESHOLD, tpm, self.TPM_THRESHOLD
+            )
             
-            return True
+            if admitted:
+                return self._last_request
+            
+            exceeded_limits = []
+            if would_exceed_rpm:
+                exceeded_limits.append(f"RPM ({rpm}/{self.RPM_THRESHOLD})")
+            if would_exceed_rpd:
+                exceeded_limits.append(f"RPD ({rpd}/{self.RPD_THRESHOLD})")
+            if would_exceed_tpm:
+                exceeded_limits.append(f"TPM ({tpm + estimated_tokens}/{self.TPM_THRESHOLD})")
+            logger.warning("🚫 Rate limits would be exceeded: %s", ', '.join(exceeded_limits))
+            
+            if would_exceed_rpd:
+                # For daily limits, we might need to wait up to 24 hours
+                logger.warning("⚠️ Daily request limit reached. Consider reducing batch size or waiting until tomorrow.")
+                return None
+            
+            # Sleep outside the lock so other requests can still run, then re-check
+            logger.info("⏳ Waiting %.1f seconds to respect rate limits...", max_wait)
+            await asyncio.sleep(max_wait + 1)  # Add 1 second buffer
     
-    def handle_429_response(self, response_headers: Dict[str, str]):
+    async def handle_429_response(self, response_headers: Dict[str, str]):
         """Handle 429 response by parsing Retry-After header and waiting."""
         retry_after = response_headers.get('retry-after') or response_headers.get('Retry-After')
         
         if retry_after:
             try:
                 wait_seconds = int(retry_after)
-                print(f"🚫 Received 429 response. Waiting {wait_seconds} seconds as specified in Retry-After header...")
-                time.sleep(wait_seconds)
+                logger.warning("🚫 Received 429 response. Waiting %d seconds as specified in Retry-After header...", wait_seconds)
+                await asyncio.sleep(wait_seconds)
             except ValueError:
                 # Retry-After might be in HTTP date format
-                print(f"🚫 Received 429 response. Waiting 60 seconds (could not parse Retry-After: {retry_after})...")
-                time.sleep(60)
+                logger.warning("🚫 Received 429 response. Waiting 60 seconds (could not parse Retry-After: %s)...", retry_after)
+                await asyncio.sleep(60)
         else:
-            print("🚫 Received 429 response. Waiting 60 seconds (no Retry-After header found)...")
-            time.sleep(60)
+            logger.warning("🚫 Received 429 response. Waiting 60 seconds (no Retry-After header found)...")
+            await asyncio.sleep(60)
     
-    def update_actual_usage(self, actual_tokens_used: int):
-        """Update usage tracking with actual token consumption from response."""
+    def update_actual_usage(self, actual_tokens_used: int, reservation: Optional[Tuple[float, int]] = None):
+        """
+        Update usage tracking with actual token consumption from response.
+        `reservation` is what check_and_wait_if_needed returned for the request; without it the most recent request is assumed.
+        """
         with self.lock:
-            current_time = time.time()
+            if reservation:
+                estimated_time, estimated_tokens = reservation
+                delta = actual_tokens_used - estimated_tokens
+                self.minute_window.adjust_tokens(estimated_time, delta)
+                self.day_window.adjust_tokens(estimated_time, delta)
+                return
             
-            # Remove the estimated entry and add actual usage
-            if self.requests_per_minute:
-                estimated_time, estimated_tokens = self.requests_per_minute[-1]
-                if abs(estimated_time - current_time) < 5:  # Within 5 seconds
-                    self.requests_per_minute[-1] = (estimated_time, actual_tokens_used)
+            current_time = time.time()
             
-            if self.requests_per_day:
-                estimated_time, estimated_tokens = self.requests_per_day[-1]
-                if abs(estimated_time - current_time) < 5:  # Within 5 seconds
-                    self.requests_per_day[-1] = (estimated_time, actual_tokens_used)
-                    
-            if self.tokens_per_minute:
-                estimated_time, estimated_tokens = self.tokens_per_minute[-1]
+            # Replace the estimate for the most recent request with the actual usage
+            if self._last_request:
+                estimated_time, estimated_tokens = self._last_request
                 if abs(estimated_time - current_time) < 5:  # Within 5 seconds
-                    self.tokens_per_minute[-1] = (estimated_time, actual_tokens_used)
+                    delta = actual_tokens_used - estimated_tokens
+                    self.minute_window.adjust_tokens(estimated_time, delta)
+                    self.day_window.adjust_tokens(estimated_time, delta)
+                    self._last_request = (estimated_time, actual_tokens_used)
     
     def update_limits(self, rpm_limit: int = None, rpd_limit: int = None, tpm_limit: int = None):
         """
@@ -220,52 +382,51 @@ class GroqRateLimiter:
             if rpm_limit is not None:
                 self.OFFICIAL_RPM_LIMIT = rpm_limit
                 self.RPM_THRESHOLD = int(rpm_limit * 0.9)
-                print(f"🔄 Updated RPM limit: {rpm_limit} (threshold: {self.RPM_THRESHOLD})")
+                logger.info("🔄 Updated RPM limit: %d (threshold: %d)", rpm_limit, self.RPM_THRESHOLD)
             
             if rpd_limit is not None:
                 self.OFFICIAL_RPD_LIMIT = rpd_limit
                 self.RPD_THRESHOLD = int(rpd_limit * 0.9)
-                print(f"🔄 Updated RPD limit: {rpd_limit} (threshold: {self.RPD_THRESHOLD})")
+                logger.info("🔄 Updated RPD limit: %d (threshold: %d)", rpd_limit, self.RPD_THRESHOLD)
             
             if tpm_limit is not None:
                 self.OFFICIAL_TPM_LIMIT = tpm_limit
                 self.TPM_THRESHOLD = int(tpm_limit * 0.9)
-                print(f"🔄 Updated TPM limit: {tpm_limit} (threshold: {self.TPM_THRESHOLD})")
+                logger.info("🔄 Updated TPM limit: %d (threshold: %d)", tpm_limit, self.TPM_THRESHOLD)
     
     def get_usage_stats(self) -> Dict[str, Any]:
         """Get current usage statistics."""
         with self.lock:
-            current_time = time.time()
-            rpm, rpd, tpm = self._get_current_usage(current_time)
-            
-            return {
-                'requests_per_minute': {
-                    'current': rpm,
-                    'limit': self.OFFICIAL_RPM_LIMIT,
-                    'threshold': self.RPM_THRESHOLD,
-                    'percentage': round((rpm / self.RPM_THRESHOLD) * 100, 1) if self.RPM_THRESHOLD > 0 else 0
-                },
-                'requests_per_day': {
-                    'current': rpd,
-                    'limit': self.OFFICIAL_RPD_LIMIT,
-                    'threshold': self.RPD_THRESHOLD,
-                    'percentage': round((rpd / self.RPD_THRESHOLD) * 100, 1) if self.RPD_THRESHOLD > 0 else 0
-                },
-                'tokens_per_minute': {
-                    'current': tpm,
-                    'limit': self.OFFICIAL_TPM_LIMIT,
-                    'threshold': self.TPM_THRESHOLD,
-                    'percentage': round((tpm / self.TPM_THRESHOLD) * 100, 1) if self.TPM_THRESHOLD > 0 else 0
-                }
+            rpm, rpd, tpm = self._get_current_usage(time.time())
+        
+        return {
+            'requests_per_minute': {
+                'current': rpm,
+                'limit': self.OFFICIAL_RPM_LIMIT,
+                'threshold': self.RPM_THRESHOLD,
+                'percentage': round((rpm / self.RPM_THRESHOLD) * 100, 1) if self.RPM_THRESHOLD > 0 else 0
+            },
+            'requests_per_day': {
+                'current': rpd,
+                'limit': self.OFFICIAL_RPD_LIMIT,
+                'threshold': self.RPD_THRESHOLD,
+                'percentage': round((rpd / self.RPD_THRESHOLD) * 100, 1) if self.RPD_THRESHOLD > 0 else 0
+            },
+            'tokens_per_minute': {
+                'current': tpm,
+                'limit': self.OFFICIAL_TPM_LIMIT,
+                'threshold': self.TPM_THRESHOLD,
+                'percentage': round((tpm / self.TPM_THRESHOLD) * 100, 1) if self.TPM_THRESHOLD > 0 else 0
             }
+        }
     
     def reset_usage(self):
         """Reset all usage tracking. Use with caution - for testing or manual resets only."""
         with self.lock:
-            self.requests_per_minute.clear()
-            self.requests_per_day.clear()
-            self.tokens_per_minute.clear()
-            print("🔄 Rate limiter usage statistics reset")
+            self.minute_window.clear()
+            self.day_window.clear()
+            self._last_request = None
+            logger.info("🔄 Rate limiter usage statistics reset")
 
 
 class RateLimitedGroqClient:
@@ -274,7 +435,7 @@ class RateLimitedGroqClient:
     This ensures consistent rate limiting without having to manually call check_and_wait_if_needed.
     """
     
-    def __init__(self, groq_client: Groq, rate_limiter: GroqRateLimiter):
+    def __init__(self, groq_client: AsyncGroq, rate_limiter: GroqRateLimiter):
         self.groq = groq_client
         self.rate_limiter = rate_limiter
         
@@ -296,23 +457,24 @@ class RateLimitedGroqClient:
                         self.groq = groq_client
                         self.rate_limiter = rate_limiter
                     
-                    def create(self, model, messages, **kwargs):
+                    async def create(self, model, messages, **kwargs):
                         """
                         Create a chat completion with automatic rate limiting.
                         This method automatically applies rate limiting before making the request.
                         """
                         # Apply rate limiting before the request
-                        if not self.rate_limiter.check_and_wait_if_needed(messages, model):
-                            print("🚫 Request skipped due to rate limits (daily limit reached)")
+                        reservation = await self.rate_limiter.check_and_wait_if_needed(messages, model)
+                        if not reservation:
+                            logger.warning("🚫 Request skipped due to rate limits (daily limit reached)")
                             return None
                         
                         # Make request to Groq with retry logic for 429 responses
                         max_retries = 3
                         for attempt in range(max_retries):
                             try:
-                                print(f"🤖 Making Groq API request (attempt {attempt + 1}/{max_retries})...")
+                                logger.debug("🤖 Making Groq API request (attempt %d/%d)...", attempt + 1, max_retries)
                                 
-                                response = self.groq.chat.completions.create(
+                                response = await self.groq.chat.completions.create(
                                     model=model,
                                     messages=messages,
                                     **kwargs
@@ -321,16 +483,16 @@ class RateLimitedGroqClient:
                                 # Update actual token usage if available
                                 if hasattr(response, 'usage') and response.usage:
                                     actual_tokens = response.usage.total_tokens
-                                    print(f"📊 Actual tokens used: {actual_tokens}")
-                                    self.rate_limiter.update_actual_usage(actual_tokens)
+                                    logger.debug("📊 Actual tokens used: %d", actual_tokens)
+                                    self.rate_limiter.update_actual_usage(actual_tokens, reservation)
                                 
-                                print("✅ Groq API request successful")
+                                logger.debug("✅ Groq API request successful")
                                 return response
                                 
                             except Exception as e:
                                 # Check if it's a 429 (rate limit) error
                                 if "429" in str(e) or "rate limit" in str(e).lower():
-                                    print(f"🚫 Rate limit error on attempt {attempt + 1}: {e}")
+                                    logger.warning("🚫 Rate limit error on attempt %d: %s", attempt + 1, e)
                                     
                                     # Try to extract headers from the exception if possible
                                     headers = {}
@@ -338,17 +500,17 @@ class RateLimitedGroqClient:
                                         headers = dict(e.response.headers)
                                     
                                     # Handle 429 response
-                                    self.rate_limiter.handle_429_response(headers)
+                                    await self.rate_limiter.handle_429_response(headers)
                                     
                                     if attempt < max_retries - 1:
-                                        print(f"🔄 Retrying request (attempt {attempt + 2}/{max_retries})...")
+                                        logger.info("🔄 Retrying request (attempt %d/%d)...", attempt + 2, max_retries)
                                         continue
                                     else:
-                                        print(f"❌ Max retries reached for 429 errors")
+                                        logger.error("❌ Max retries reached for 429 errors")
                                         return None
                                 else:
                                     # Non-429 error, don't retry
-                                    print(f"❌ Non-rate-limit error with Groq API: {e}")
+                                    logger.error("❌ Non-rate-limit error with Groq API: %s", e)
                                     return None
                         
                         return None
@@ -358,205 +520,11 @@ class RateLimitedGroqClient:
         return ChatWrapper(self.groq, self.rate_limiter)
 
 
-class EventExtractor:
-    def __init__(self):
-        """Initialize the event extractor with Supabase and Groq clients."""
-        self.supabase_url = os.getenv("SUPABASE_PROJECT_URL")
-        self.supabase_key = os.getenv("SUPABASE_SERVICE_ROLE")
-        self.groq_api_key = os.getenv("GROQ_API_KEY")
-        
-        if not all([self.supabase_url, self.supabase_key, self.groq_api_key]):
-            raise ValueError("Missing required environment variables: SUPABASE_PROJECT_URL, SUPABASE_SERVICE_ROLE, GROQ_API_KEY")
-        
-        self.supabase: Client = create_client(self.supabase_url, self.supabase_key)
-        
-        # Initialize rate limiter first
-        self.rate_limiter = GroqRateLimiter()
-        
-        # Create rate-limited Groq client wrapper
-        raw_groq_client = Groq(api_key=self.groq_api_key)
-        self.groq = RateLimitedGroqClient(raw_groq_client, self.rate_limiter)
-        
-        # Load the JSON schema for structured output
-        schema_path = Path(__file__).parent / "groq_output_schema.json"
-        with open(schema_path, 'r') as f:
-            self.output_schema = json.load(f)
-    
-    def fetch_unprocessed_posts(self, limit: int = None) -> List[Dict[str, Any]]:
-        """Fetch unprocessed posts with their associated profile and image data."""
-        try:
-            # Fetch posts that haven't been processed yet
-            query = self.supabase.table('posts').select(
-                '''
-                *,
-                profiles:username_id (
-                    username,
-                    bio,
-                    bio_file_path,
-                    id,
-                    school_id
-                ),
-                post_images (
-                    file_path
-                )
-                '''
-            ).eq('processed', False)
-            
-            # Only apply limit if specified
-            if limit:
-                query = query.limit(limit)
-                
-            posts_response = query.execute()
-            posts_data = posts_response.data if posts_response.data else []
-            
-            # Filter out posts older than 1 month and mark them as processed
-            current_time = datetime.now(timezone.utc)
-            one_month_ago = current_time - timedelta(days=30)
-            
-            valid_posts = []
-            old_post_ids = []
-            
-            for post in posts_data:
-                try:
-                    # Parse the created_at timestamp
-                    created_at = date_parser.parse(post.get('created_at', ''))
-                    if created_at.tzinfo is None:
-                        created_at = created_at.replace(tzinfo=timezone.utc)
-                    
-                    if created_at < one_month_ago:
-                        print(f"⏰ Post from @{post.get('profiles', {}).get('username', 'unknown')} is older than 1 month ({created_at.strftime('%Y-%m-%d')}) - marking as processed")
-                        old_post_ids.append(post['id'])
-                    else:
-                        valid_posts.append(post)
-                except Exception as date_error:
-                    print(f"⚠️ Could not parse date for post {post.get('id')}: {date_error} - including in processing")
-                    valid_posts.append(post)
-            
-            # Mark old posts as processed in batch
-            if old_post_ids:
-                try:
-                    for post_id in old_post_ids:
-                        self.supabase.table('posts').update({'processed': True}).eq('id', post_id).execute()
-                    print(f"✅ Marked {len(old_post_ids)} old posts as processed")
-                except Exception as e:
-                    print(f"⚠️ Error marking old posts as processed: {e}")
-            
-            return valid_posts
-            
-        except Exception as e:
-            print(f"Error fetching posts: {e}")
-            return []
-    
-    def read_file_content(self, file_path: str, bucket_name: str) -> Optional[str]:
-        """Read content from a Supabase Storage file path."""
-        try:
-            if file_path:
-                # Download file content from Supabase Storage
-                response = self.supabase.storage.from_(bucket_name).download(file_path)
-                if response:
-                    # Decode bytes to string for text files
-                    content = response.decode('utf-8')
-                    return content
-        except Exception as e:
-            print(f"Error reading file {file_path} from storage: {e}")
-        return None
-    
-    def prepare_groq_request(self, post_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Prepare the request data for Groq API."""
-        profile = post_data.get('profiles', {})
-        post_images = post_data.get('post_images', [])
-        
-        # Parse posted date for context - this is critical for relative date resolution
-        posted_at = None
-        posted_at_str = "Unknown"
-        posted_year = "Unknown"
-        posted_month = "Unknown"
-        posted_day_of_week = "Unknown"
-        try:
-            if post_data.get('created_at'):
-                posted_at = date_parser.parse(post_data['created_at'])
-                if posted_at.tzinfo is None:
-                    posted_at = posted_at.replace(tzinfo=timezone.utc)
-                posted_at_str = posted_at.strftime('%A, %B %d, %Y at %I:%M %p UTC')
-                posted_year = str(posted_at.year)
-                posted_month = posted_at.strftime('%B')
-                posted_day_of_week = posted_at.strftime('%A')
-        except Exception as e:
-            print(f"⚠️ Could not parse posted date: {e}")
-        
-        # Read caption content if available
-        caption_content = None
-        if post_data.get('caption_path'):
-            caption_content = self.read_file_content(post_data['caption_path'], "instagram-captions")
-        
-        # Read bio content if available
-        bio_content = profile.get('bio', '')
-        if profile.get('bio_file_path'):
-            file_bio = self.read_file_content(profile['bio_file_path'], "instagram-bios")
-            if file_bio:
-                bio_content = file_bio
-        
-        # Prepare text content for Groq with posting context
-        text_content = f"""
-        Instagram Profile: @{profile.get('username', 'unknown')}
-        
-        Bio: {bio_content or 'No bio available'}
-        
-        Post Caption: {caption_content or 'No caption available'}
-        
-        **🎯 CRITICAL POSTING CONTEXT FOR DATE RESOLUTION:**
-        POST PUBLICATION DATE: {posted_at_str}
-        POST YEAR: {posted_year}
-        POST MONTH: {posted_month}  
-        POST DAY OF WEEK: {posted_day_of_week}
-        
-        ⚠️ MANDATORY: All relative dates ("this Friday", "next week", "tomorrow", "this year") MUST be resolved against the POST PUBLICATION DATE above, NOT today's date.
-        
-        Example: If post was published on "Wednesday, January 10, 2024" and mentions "this Friday", that means "Friday, January 12, 2024".
-        """
-        
-        # Prepare image attachments (limit to 3 as per Groq's vision limit)
-        image_contents = []
-        for i, img in enumerate(post_images[:3]):  # Max 3 images
-            if img.get('file_path'):
-                try:
-                    # Download image data from Supabase Storage
-                    image_data = self.supabase.storage.from_("instagram-posts").download(img['file_path'])
-                    if image_data:
-                        # Encode image as base64 for Groq
-                        base64_image = base64.b64encode(image_data).decode('utf-8')
-                        image_contents.append({
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/jpeg;base64,{base64_image}"
-                            }
-                        })
-                except Exception as e:
-                    print(f"Error reading image {img['file_path']}: {e}")
-        
-        return {
-            'text_content': text_content,
-            'image_contents': image_contents,
-            'post_id': post_data.get('id'),
-            'username': profile.get('username'),
-            'profile_id': profile.get('id'),
-            'school_id': profile.get('school_id'),
-            'posted_at': posted_at,
-            'posted_at_str': posted_at_str
-        }
-    
-    def extract_events_with_groq(self, request_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """Send data to Groq and get structured event extraction with rate limiting."""
-        try:
-            # Get current date information for the prompt
-            current_datetime = datetime.now()
-            current_date_str = current_datetime.strftime('%Y-%m-%d')
-            current_year = current_datetime.year
-            
-            system_prompt = f"""
+# System prompt for event extraction; {current_*} placeholders are filled once per day by _get_system_prompt
+SYSTEM_PROMPT_TEMPLATE = """
 You are an **Event Intelligence Agent** extracting school events from Instagram posts.
 
-**CURRENT DATE/TIME**: {current_date_str} ({current_datetime.strftime('%A')})
+**CURRENT DATE/TIME**: {current_date_str} ({current_weekday})
 **CURRENT YEAR**: {current_year}
 
 **CRITICAL: ANNOUNCEMENT vs NEWS DETECTION - APPLY FIRST**:
@@ -666,6 +634,471 @@ ONLY extract events from posts that are **ANNOUNCEMENTS** of future activities,
 
 **OUTPUT**: JSON object only, no commentary.
             """
+
+# Structured-output schema and the response_format built from it, loaded once at import and shared by every request
+OUTPUT_SCHEMA = orjson.loads((Path(__file__).parent / "groq_output_schema.json").read_bytes())
+RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "event_extraction",
+        "schema": OUTPUT_SCHEMA
+    }
+}
+
+
+class EventExtractor:
+    GROQ_MODEL = "meta-llama/Llama-4-Maverick-17B-128E-Instruct"
+    GROQ_TEMPERATURE = 0.4           # Slightly higher temperature for better reasoning
+    GROQ_MAX_TOKENS = 4000
+    GROQ_TIMEOUT_SECONDS = 60        # Per-request timeout for Groq API calls
+    GROQ_KEEPALIVE_CONNECTIONS = 20  # Idle connections kept open to Groq between concurrent posts
+    
+    def __init__(self):
+        """Initialize the event extractor with Supabase and Groq clients."""
+        self.supabase_url = os.getenv("SUPABASE_PROJECT_URL")
+        self.supabase_key = os.getenv("SUPABASE_SERVICE_ROLE")
+        self.groq_api_key = os.getenv("GROQ_API_KEY")
+        
+        if not all([self.supabase_url, self.supabase_key, self.groq_api_key]):
+            raise ValueError("Missing required environment variables: SUPABASE_PROJECT_URL, SUPABASE_SERVICE_ROLE, GROQ_API_KEY")
+        
+        # One client for the extractor's lifetime: it keeps a single pooled keep-alive httpx session each for
+        # PostgREST and Storage, shared by every _db_pool/_io_pool thread. Don't create clients per call.
+        self.supabase: Client = create_client(self.supabase_url, self.supabase_key)
+        
+        # Initialize rate limiter first, counting text tokens with a real BPE tokenizer when available
+        self.rate_limiter = GroqRateLimiter(tokenizer=self._load_tokenizer())
+        
+        # Create rate-limited Groq client wrapper. The concurrent posts in run_extraction_batch share one
+        # keep-alive connection pool instead of the SDK default. (groq 0.4.1 only accepts an httpx client here;
+        # the aiohttp transport, DefaultAioHttpClient, needs a much newer SDK.)
+        raw_groq_client = AsyncGroq(
+            api_key=self.groq_api_key,
+            http_client=httpx.AsyncClient(
+                # HTTP/2 multiplexes the concurrent image-laden requests over shared connections
+                http2=True,
+                timeout=self.GROQ_TIMEOUT_SECONDS,
+                limits=httpx.Limits(
+                    max_connections=self.GROQ_KEEPALIVE_CONNECTIONS,
+                    max_keepalive_connections=self.GROQ_KEEPALIVE_CONNECTIONS,
+                ),
+            ),
+        )
+        self.groq = RateLimitedGroqClient(raw_groq_client, self.rate_limiter)
+        
+        # JSON schema for structured output (module-level, loaded once)
+        self.output_schema = OUTPUT_SCHEMA
+        
+        # Junction rows queued by _insert_transaction and written in bulk by flush_pending_links
+        self._pending_event_categories: List[Dict[str, Any]] = []
+        self._pending_event_tags: List[Dict[str, Any]] = []
+        
+        # Validated events ({'event': row, 'cat_names': [...], 'tag_names': [...]}) waiting for flush_pending_events
+        self._pending_events: List[Dict[str, Any]] = []
+        # Posts whose event insert failed ambiguously; run_extraction_batch leaves them unprocessed
+        self._unflushed_post_ids: set = set()
+        
+        # Category name -> id; categories are never renamed or deleted, so this lives as long as the extractor
+        self._category_id_cache: Dict[str, str] = {}
+        
+        # insert_event(s)_with_links (supabase_migrations.sql) write events and their links in one round trip;
+        # flips to False the first time PostgREST reports the function missing, and the REST path is used instead
+        self._links_rpc_available = True
+        
+        # (date, rendered prompt) - the system prompt only changes when the calendar day does
+        self._cached_prompt: Tuple[Optional[date], Optional[str]] = (None, None)
+        
+        # (monotonic time read, UTC "now") shared by every event validated in a batch; see _batch_clock
+        self._batch_now: Tuple[float, Optional[datetime]] = (0.0, None)
+        
+        # Optional direct Postgres connection for bulk writes; REST is used when it's not configured
+        self.pg = self._connect_postgres(os.getenv("SUPABASE_DB_URL"))
+        self._pg_lock = threading.Lock()
+        
+        # Prefetched, already-downscaled post images keyed by storage path (filled by prefetch_post_images)
+        self._image_cache: Dict[str, bytes] = {}
+        # Caption hashes known to produce no events (no_event_captions table) and the ones found this batch
+        self._no_event_hashes: set = set()
+        self._new_no_event_hashes: List[str] = []
+        
+        # (signed URL, monotonic deadline) by storage path, used instead of downloading when SEND_IMAGE_URLS is on
+        self._image_urls: Dict[str, Tuple[str, float]] = {}
+        
+        # Caption/bio downloads keyed by (bucket, path): many posts share a profile bio, and caching the
+        # Future (not the text) also dedups reads that are still in flight. Cleared per fetch.
+        self._read_file_future = functools.lru_cache(maxsize=1024)(
+            lambda bucket_name, file_path: _io_pool.submit(self.read_file_content, file_path, bucket_name)
+        )
+    
+    @staticmethod
+    def _connect_postgres(dsn: Optional[str]):
+        """Open a keepalive psycopg2 connection to the Supabase database, or return None to use REST only."""
+        if not dsn:
+            return None
+        try:
+            conn = psycopg2.connect(dsn, keepalives=1, keepalives_idle=30, keepalives_interval=10, keepalives_count=3)
+            logger.info("🐘 Connected directly to Postgres for bulk writes")
+            return conn
+        except Exception as e:
+            logger.warning("⚠️ Could not connect to Postgres, using the REST API only: %s", e)
+            return None
+    
+    def _pg_execute(self, sql: str, params: tuple) -> bool:
+        """Run one statement in its own transaction on the direct connection. Returns False if REST should be used instead."""
+        if self.pg is None:
+            return False
+        with self._pg_lock:
+            try:
+                with self.pg:  # Commits on success, rolls back on error
+                    with self.pg.cursor() as cur:
+                        cur.execute(sql, params)
+                return True
+            except psycopg2.Error as e:
+                logger.warning("⚠️ Postgres write failed, falling back to REST: %s", e)
+                if self.pg.closed:
+                    self.pg = None
+                return False
+    
+    @staticmethod
+    def _load_tokenizer():
+        """Load the tiktoken encoding used for token estimates, or None to use the character heuristic."""
+        try:
+            # cl100k_base is close enough to the Llama BPE vocabulary for rate-limit budgeting
+            return tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            logger.warning("⚠️ Could not load tokenizer, falling back to character-based token estimates: %s", e)
+            return None
+    
+    FETCH_PAGE_SIZE = 1000  # Supabase's default max-rows per response
+    
+    POST_MAX_AGE_DAYS = 30  # Older posts are retired unprocessed; see mark_stale_posts_processed
+    
+    def _processing_cutoff(self) -> str:
+        """ISO timestamp before which posts are no longer processed (and no-event hashes no longer matter)."""
+        return (datetime.now(timezone.utc) - timedelta(days=self.POST_MAX_AGE_DAYS)).isoformat()
+    
+    def fetch_unprocessed_posts(self, limit: int = None) -> List[Dict[str, Any]]:
+        """Fetch unprocessed posts with their associated profile and image data."""
+        # Posts older than 1 month are retired server-side and never downloaded
+        cutoff = self._processing_cutoff()
+        self.mark_stale_posts_processed(cutoff)
+        
+        # Storage contents may have changed since the last batch
+        self._read_file_future.cache_clear()
+        
+        # Fetch posts that haven't been processed yet and are recent enough to matter
+        def unprocessed_query():
+            # Only the post columns the pipeline reads, plus the embedded profile/school/images - one request.
+            # Embedding means there's no per-post profile lookup (cached or otherwise); per-profile bio files are
+            # shared across that profile's posts by _read_file_future
+            return self.supabase.table('posts').select(
+                '''
+                id,
+                caption_path,
+                created_at,
+                profiles:username_id (
+                    username,
+                    bio,
+                    bio_file_path,
+                    id,
+                    school_id,
+                    schools:school_id (
+                        name,
+                        address
+                    )
+                ),
+                post_images (
+                    file_path
+                )
+                '''
+            ).eq('processed', False).gte('created_at', cutoff)
+        
+        try:
+            # Only apply limit if specified
+            if limit:
+                posts_response = unprocessed_query().limit(limit).execute()
+                return posts_response.data if posts_response.data else []
+            
+            # PostgREST caps each response at its max-rows setting, so page through the whole backlog
+            # (ordered by id so pages don't overlap) in FETCH_PAGE_SIZE requests
+            posts = []
+            while True:
+                page = unprocessed_query().order('id').range(len(posts), len(posts) + self.FETCH_PAGE_SIZE - 1).execute().data or []
+                posts.extend(page)
+                if len(page) < self.FETCH_PAGE_SIZE:
+                    return posts
+            
+        except Exception as e:
+            logger.error("Error fetching posts: %s", e)
+            return []
+    
+    def mark_stale_posts_processed(self, cutoff: str) -> None:
+        """Mark every unprocessed post created before `cutoff` (ISO timestamp) as processed in one UPDATE."""
+        if self._pg_execute(
+            "UPDATE posts SET processed = true WHERE processed = false AND created_at < %s",
+            (cutoff,)
+        ):
+            return
+        try:
+            self.supabase.table('posts').update(
+                {'processed': True}, returning=ReturnMethod.minimal
+            ).eq('processed', False).lt('created_at', cutoff).execute()
+        except Exception as e:
+            logger.warning("⚠️ Error marking old posts as processed: %s", e)
+    
+    def read_file_content(self, file_path: str, bucket_name: str) -> Optional[str]:
+        """
+        Read content from a Supabase Storage file path.
+        Callers only pass paths recorded on the post/profile rows (caption_path, bio_file_path), so a missing file is
+        the rare case; through _read_file_future its None result is cached for the batch and never retried.
+        """
+        try:
+            if file_path:
+                # Download file content from Supabase Storage
+                response = self.supabase.storage.from_(bucket_name).download(file_path)
+                if response:
+                    # Decode bytes to string for text files
+                    content = response.decode('utf-8')
+                    return content
+        except Exception as e:
+            logger.error("Error reading file %s from storage: %s", file_path, e)
+        return None
+    
+    # Image prep: the vision model sees a fixed token count per image, so full-resolution uploads are wasted bytes
+    MAX_IMAGE_DIMENSION = 1024
+    JPEG_QUALITY = 80
+    
+    def _download_image(self, file_path: str) -> bytes:
+        """Download a post image and downscale/recompress it for Groq. Runs on _io_pool."""
+        image_data = self.supabase.storage.from_("instagram-posts").download(file_path)
+        return self._shrink_image(file_path, image_data)
+    
+    def _shrink_image(self, file_path: str, image_data: bytes) -> bytes:
+        """Downscale/recompress downloaded image bytes for Groq, returning the original bytes on failure."""
+        if not image_data:
+            return image_data
+        try:
+            img = Image.open(BytesIO(image_data))
+            size = (self.MAX_IMAGE_DIMENSION, self.MAX_IMAGE_DIMENSION)
+            # JPEGs can be decoded directly at a reduced scale (never below `size`), skipping most of the decode work
+            img.draft('RGB', size)
+            # Lanczos keeps small text on flyers legible after downscaling
+            img.thumbnail(size, Image.Resampling.LANCZOS)
+            if img.mode != 'RGB':
+                img = img.convert('RGB')
+            buf = BytesIO()
+            img.save(buf, 'JPEG', quality=self.JPEG_QUALITY, optimize=True)
+            resized = buf.getvalue()
+            # Small images can grow when re-encoded; keep whichever is smaller
+            return resized if len(resized) < len(image_data) else image_data
+        except Exception as e:
+            logger.warning("⚠️ Could not downscale image %s, sending original: %s", file_path, e)
+            return image_data
+    
+    SIGNED_URL_TTL = 3600         # Seconds a window's signed URLs stay valid
+    SIGNED_URL_MARGIN = 120       # Treat URLs as expired this long early, leaving Groq time to fetch them
+    PREFETCH_CONNECTIONS = 20     # Concurrent connections to Storage during prefetch
+    # Send Groq signed Storage URLs instead of downloaded, downscaled base64 images. Skips the download and
+    # encode entirely, but Groq then sees (and bills tokens for) the full-size originals
+    SEND_IMAGE_URLS = os.getenv("GROQ_IMAGE_URLS", "").lower() in ("1", "true", "yes")
+    
+    def _image_future(self, file_path: str) -> Future:
+        """Future for an image's bytes: already resolved if prefetched, otherwise a download on _io_pool."""
+        image_data = self._image_cache.pop(file_path, None)
+        if image_data is None:
+            return _io_pool.submit(self._download_image, file_path)
+        future = Future()
+        future.set_result(image_data)
+        return future
+    
+    def _signed_image_url(self, file_path: str) -> Optional[str]:
+        """The window's signed URL for an image, or None if there is none or it's about to expire (download instead)."""
+        url, deadline = self._image_urls.pop(file_path, (None, 0.0))
+        return url if url and time.monotonic() < deadline else None
+    
+    TEXT_PREFETCH_POSTS = 512  # Keeps caption + bio futures within _read_file_future's 1024-entry cache
+    PREFETCH_WINDOW_POSTS = 64  # Posts whose texts and images run_extraction_batch fetches ahead at a time
+    
+    def prefetch_post_texts(self, posts: List[Dict[str, Any]]) -> None:
+        """
+        Start the caption and bio downloads for a window of posts on _io_pool without waiting for them, so they overlap
+        the image prefetch. prepare_groq_request gets the same futures back from _read_file_future.
+        """
+        for post in posts[:self.TEXT_PREFETCH_POSTS]:
+            if post.get('caption_path'):
+                self._read_file_future("instagram-captions", post['caption_path'])
+            profile = post.get('profiles') or {}
+            if profile.get('bio_file_path'):
+                self._read_file_future("instagram-bios", profile['bio_file_path'])
+    
+    async def prefetch_post_images(self, posts: List[Dict[str, Any]]) -> None:
+        """
+        Download every image a window of posts will send to Groq up front: one signed-URL request for all paths,
+        then concurrent GETs over a single pooled aiohttp session. Results land in self._image_cache,
+        which prepare_groq_request consumes; anything missing is downloaded per post as before.
+        With SEND_IMAGE_URLS the signed URLs themselves are kept for prepare_groq_request and nothing is downloaded;
+        run_extraction_batch signs each window just before queueing its posts, and a URL that still outlives
+        SIGNED_URL_TTL falls back to a download.
+        """
+        file_paths = [
+            img['file_path']
+            for post in posts
+            for img in post.get('post_images', [])[:3]
+            if img.get('file_path')
+        ]
+        if not file_paths:
+            return
+        
+        try:
+            signed = await run_blocking(
+                self.supabase.storage.from_("instagram-posts").create_signed_urls, file_paths, self.SIGNED_URL_TTL
+            )
+        except Exception as e:
+            logger.warning("⚠️ Could not sign image URLs, images will be downloaded per post: %s", e)
+            return
+        
+        urls = {
+            item['path']: item.get('signedURL') or item.get('signedUrl')
+            for item in signed
+            if not item.get('error') and (item.get('signedURL') or item.get('signedUrl'))
+        }
+        if self.SEND_IMAGE_URLS:
+            deadline = time.monotonic() + self.SIGNED_URL_TTL - self.SIGNED_URL_MARGIN
+            self._image_urls.update((path, (url, deadline)) for path, url in urls.items())
+            logger.info("🖼️ Signed %d/%d image URLs for Groq", len(urls), len(file_paths))
+            return
+        loop = asyncio.get_running_loop()
+        
+        async def fetch(session: aiohttp.ClientSession, file_path: str, url: str):
+            try:
+                async with session.get(url) as response:
+                    response.raise_for_status()
+                    image_data = await response.read()
+                self._image_cache[file_path] = await loop.run_in_executor(_io_pool, self._shrink_image, file_path, image_data)
+            except Exception as e:
+                logger.warning("⚠️ Prefetch failed for image %s: %s", file_path, e)
+        
+        connector = aiohttp.TCPConnector(limit=self.PREFETCH_CONNECTIONS)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            await asyncio.gather(*(fetch(session, path, url) for path, url in urls.items()))
+        logger.info("🖼️ Prefetched %d/%d images", len(self._image_cache), len(file_paths))
+    
+    async def prepare_groq_request(self, post_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Prepare the request data for Groq API."""
+        profile = post_data.get('profiles', {})
+        post_images = post_data.get('post_images', [])
+        
+        # Parse posted date for context - this is critical for relative date resolution
+        posted_at = None
+        posted_at_str = "Unknown"
+        posted_year = "Unknown"
+        posted_month = "Unknown"
+        posted_day_of_week = "Unknown"
+        try:
+            if post_data.get('created_at'):
+                posted_at = parse_datetime(post_data['created_at'])
+                if posted_at.tzinfo is None:
+                    posted_at = posted_at.replace(tzinfo=timezone.utc)
+                posted_at_str = posted_at.strftime('%A, %B %d, %Y at %I:%M %p UTC')
+                posted_year = str(posted_at.year)
+                posted_month = posted_at.strftime('%B')
+                posted_day_of_week = posted_at.strftime('%A')
+        except Exception as e:
+            logger.warning("⚠️ Could not parse posted date: %s", e)
+        
+        # Start caption, bio and image downloads concurrently; each is a blocking storage round-trip
+        caption_future = None
+        if post_data.get('caption_path'):
+            caption_future = self._read_file_future("instagram-captions", post_data['caption_path'])
+        bio_future = None
+        if profile.get('bio_file_path'):
+            bio_future = self._read_file_future("instagram-bios", profile['bio_file_path'])
+        # Limit to 3 images as per Groq's vision limit. Each source is a signed URL Groq fetches itself
+        # (GROQ_IMAGE_URLS) or a future for the image bytes
+        image_sources = [
+            (img['file_path'], self._signed_image_url(img['file_path']) or self._image_future(img['file_path']))
+            for img in post_images[:3] if img.get('file_path')
+        ]
+        
+        # Read caption content if available
+        caption_content = await asyncio.wrap_future(caption_future) if caption_future else None
+        
+        # Read bio content if available
+        bio_content = profile.get('bio', '')
+        if bio_future:
+            file_bio = await asyncio.wrap_future(bio_future)
+            if file_bio:
+                bio_content = file_bio
+        
+        # Prepare text content for Groq with posting context
+        text_content = f"""
+        Instagram Profile: @{profile.get('username', 'unknown')}
+        
+        Bio: {bio_content or 'No bio available'}
+        
+        Post Caption: {caption_content or 'No caption available'}
+        
+        **🎯 CRITICAL POSTING CONTEXT FOR DATE RESOLUTION:**
+        POST PUBLICATION DATE: {posted_at_str}
+        POST YEAR: {posted_year}
+        POST MONTH: {posted_month}  
+        POST DAY OF WEEK: {posted_day_of_week}
+        
+        ⚠️ MANDATORY: All relative dates ("this Friday", "next week", "tomorrow", "this year") MUST be resolved against the POST PUBLICATION DATE above, NOT today's date.
+        
+        Example: If post was published on "Wednesday, January 10, 2024" and mentions "this Friday", that means "Friday, January 12, 2024".
+        """
+        
+        # Prepare image attachments in post order as the downloads finish
+        image_contents = []
+        for file_path, source in image_sources:
+            try:
+                if isinstance(source, str):
+                    image_contents.append({"type": "image_url", "image_url": {"url": source}})
+                    continue
+                image_data = await asyncio.wrap_future(source)
+                if image_data:
+                    # Build the data URL as bytes and decode once; base64 output is pure ASCII
+                    data_url = (b"data:image/jpeg;base64," + base64.b64encode(image_data)).decode('ascii')
+                    image_contents.append({
+                        "type": "image_url",
+                        "image_url": {
+                            "url": data_url
+                        }
+                    })
+            except Exception as e:
+                logger.error("Error reading image %s: %s", file_path, e)
+        
+        return {
+            'text_content': text_content,
+            'image_contents': image_contents,
+            'post_id': post_data.get('id'),
+            'username': profile.get('username'),
+            'profile_id': profile.get('id'),
+            'school_id': profile.get('school_id'),
+            'posted_at': posted_at,
+            'posted_at_str': posted_at_str,
+            'caption': caption_content,
+            'bio': bio_content,
+            'image_paths': [file_path for file_path, _ in image_sources]
+        }
+    
+    def _get_system_prompt(self) -> str:
+        """Return the system prompt rendered for today, re-rendering only when the date changes."""
+        current_datetime = datetime.now()
+        today = current_datetime.date()
+        if self._cached_prompt[0] != today:
+            self._cached_prompt = (today, SYSTEM_PROMPT_TEMPLATE.format(
+                current_date_str=current_datetime.strftime('%Y-%m-%d'),
+                current_weekday=current_datetime.strftime('%A'),
+                current_year=current_datetime.year,
+            ))
+        return self._cached_prompt[1]
+    
+    async def extract_events_with_groq(self, request_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Send data to Groq and get structured event extraction with rate limiting."""
+        try:
+            system_prompt = self._get_system_prompt()
             
             # Prepare messages - start with text content and images in one message
             user_content = [{"type": "text", "text": request_data['text_content']}]
@@ -685,132 +1118,149 @@ ONLY extract events from posts that are **ANNOUNCEMENTS** of future activities,
                 }
             ]
             
-            model = "meta-llama/Llama-4-Maverick-17B-128E-Instruct"
-            
             # Make request using the rate-limited wrapper (automatically handles rate limiting and retries)
-            response = self.groq.chat.completions.create(
-                model=model,
+            response = await self.groq.chat.completions.create(
+                model=self.GROQ_MODEL,
                 messages=messages,
-                response_format={
-                    "type": "json_schema",
-                    "json_schema": {
-                        "name": "event_extraction",
-                        "schema": self.output_schema
-                    }
-                },
-                temperature=0.4,  # Slightly higher temperature for better reasoning
-                max_tokens=4000
+                response_format=RESPONSE_FORMAT,
+                temperature=self.GROQ_TEMPERATURE,
+                max_tokens=self.GROQ_MAX_TOKENS
             )
             
             if response is None:
                 return None
             
-            # Parse the structured response
-            raw_content = response.choices[0].message.content
-            extracted_data = json.loads(raw_content)
+            # Not streamed: Groq doesn't allow streaming together with structured outputs
+            extracted_data = parse_json_response(response.choices[0].message.content or '')
             return extracted_data
             
         except Exception as e:
-            print(f"❌ Unexpected error with Groq extraction: {e}")
+            logger.error("❌ Unexpected error with Groq extraction: %s", e)
             return None
     
     # =====================
     # Validation & Insert
     # =====================
-    CATEGORY_ENUM = ["event", "club", "sport", "deadline", "meeting"]
-    TYPE_ENUM = ["in-person", "virtual", "hybrid"]
+    CATEGORY_ENUM = frozenset({"event", "club", "sport", "deadline", "meeting"})
+    _PUNCT_TABLE = str.maketrans('', '', string.punctuation)  # Built once, used by _normalize_tag
+    _YEAR_RE = re.compile(r'202[4-9]')                        # Explicit year (2024-2029) mentioned in event text
+    TYPE_ENUM = frozenset({"in-person", "virtual", "hybrid"})
+    LINK_INSERT_CHUNK_SIZE = 500  # Rows per bulk insert request for event_categories / event_tags
+    POST_ID_CHUNK_SIZE = 500      # Ids per UPDATE ... WHERE id IN (...) request (keeps the URL short)
     
-    def _to_utc(self, dt_str: str) -> Optional[str]:
-        """Convert any datetime string to ISO-8601 UTC string. Handles both date-only and datetime formats."""
+    def _to_utc_dt(self, dt_str: str) -> Optional[datetime]:
+        """Parse any datetime string to an aware UTC datetime. Handles both date-only and datetime formats."""
         if not dt_str:
             return None
         try:
-            dt = date_parser.parse(dt_str)
+            dt = parse_datetime(dt_str)
             # If no timezone info, assume UTC
             if not dt.tzinfo:
                 dt = dt.replace(tzinfo=timezone.utc)
             # Convert to UTC
-            dt_utc = dt.astimezone(timezone.utc)
-            return dt_utc.isoformat()
+            return dt.astimezone(timezone.utc)
         except Exception as e:
-            print(f"    ⚠️ Could not parse datetime '{dt_str}': {e}")
+            logger.warning("    ⚠️ Could not parse datetime '%s': %s", dt_str, e)
             return None
     
-    def _normalize_tag(self, tag: str) -> str:
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def _normalize_tag(tag: str) -> str:
+        # Cached: the same tags ("Basketball", school names) repeat across events and posts
         tag = tag.strip().lstrip('#')
         # Remove punctuation but preserve spaces
-        tag = tag.translate(str.maketrans('', '', string.punctuation))
+        tag = tag.translate(EventExtractor._PUNCT_TABLE)
         if tag.endswith('s') and not tag.endswith('ss') and len(tag) > 3:
             tag = tag[:-1]
         return tag.title()
     
-    def _is_event_in_past(self, start_datetime_str: str, is_all_day: bool = False) -> bool:
+    @staticmethod
+    def _is_datetime_in_past(event_dt: datetime, is_all_day: bool, current_time: datetime) -> bool:
+        """True if the event (an aware datetime) has already happened as of `current_time`; all-day events compare dates only."""
+        if is_all_day:
+            # For all-day events, compare dates only
+            return event_dt.date() < current_time.date()
+        # For timed events, compare full datetime
+        return event_dt < current_time
+    
+    def _clean_categories(self, raw_categories: List[Any]) -> List[str]:
+        """Lowercase, enum-filter and deduplicate (order-preserving) categories given as dicts or strings."""
+        seen = set()
+        categories = []
+        for c in raw_categories or []:
+            name = c.get('name') if isinstance(c, dict) else c
+            if not isinstance(name, str) or not name.strip():
+                continue
+            name = name.strip().lower()
+            if name not in self.CATEGORY_ENUM:
+                name = 'event'
+            # DEDUPLICATE as we go to prevent constraint violations
+            if name not in seen:
+                seen.add(name)
+                categories.append(name)
+        return categories
+    
+    def _clean_tags(self, raw_tags: List[Any]) -> List[str]:
+        """Normalize and deduplicate (order-preserving) tags given as dicts or strings."""
+        seen_raw = set()  # Repeated raw spellings skip _normalize_tag entirely
+        seen = set()
+        tags = []
+        for t in raw_tags or []:
+            raw = t.get('tag') if isinstance(t, dict) else t
+            if not isinstance(raw, str):
+                continue
+            raw = raw.strip()
+            if not raw or raw in seen_raw:
+                continue
+            seen_raw.add(raw)
+            tag = self._normalize_tag(raw)
+            # DEDUPLICATE as we go to prevent constraint violations
+            if tag and tag not in seen:
+                seen.add(tag)
+                tags.append(tag)
+        return tags
+    
+    def _validate_event(self, raw_event: Dict[str, Any], top_level_categories: List[str] = None, top_level_tags: List[str] = None, posted_at: datetime = None, now: datetime = None) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
         """
-        Bulletproof check to determine if an event is in the past.
-        Returns True if event has already happened, False if it's current/future.
+        Validate and normalize a single event dict. Returns (cleaned_dict, reason) where reason is 'past' if event is in the past, 'validation_failed' if validation failed, or None if successful.
+        top_level_categories / top_level_tags must already be cleaned with _clean_categories / _clean_tags.
+        `now` (UTC) is used for the past and 120-day checks; defaults to the current time.
         """
-        if not start_datetime_str:
-            return False  # If no date, can't determine - allow it through
-        
-        try:
-            event_dt = date_parser.parse(start_datetime_str)
-            if not event_dt.tzinfo:
-                event_dt = event_dt.replace(tzinfo=timezone.utc)
-            
-            current_time = datetime.now(timezone.utc)
-            
-            if is_all_day:
-                # For all-day events, compare dates only
-                event_date = event_dt.date()
-                current_date = current_time.date()
-                return event_date < current_date
-            else:
-                # For timed events, compare full datetime
-                return event_dt < current_time
-                
-        except Exception as e:
-            print(f"    ⚠️ Could not parse event datetime '{start_datetime_str}': {e}")
-            return False  # If we can't parse, allow it through for manual review
-    
-    def _validate_event(self, raw_event: Dict[str, Any], top_level_categories: List[Dict] = None, top_level_tags: List[Dict] = None, posted_at: datetime = None) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
-        """Validate and normalize a single event dict. Returns (cleaned_dict, reason) where reason is 'past' if event is in the past, 'validation_failed' if validation failed, or None if successful."""
-        start = self._to_utc(raw_event.get('start_datetime'))
-        end = self._to_utc(raw_event.get('end_datetime'))
+        # Parse each datetime once; both checks below reuse them
+        start_dt = self._to_utc_dt(raw_event.get('start_datetime'))
+        end_dt = self._to_utc_dt(raw_event.get('end_datetime'))
+        current_time = now or datetime.now(timezone.utc)
         
         # No automatic year updating - Groq should handle date validation
         
         # Ensure end after start if both exist
-        if start and end and end < start:
-            end = start
+        if start_dt and end_dt and end_dt < start_dt:
+            end_dt = start_dt
+        start = start_dt.isoformat() if start_dt else None
+        end = end_dt.isoformat() if end_dt else None
         
         # BULLETPROOF: Skip events that have already happened (are in the past)
         is_all_day = bool(raw_event.get('is_all_day'))
-        if self._is_event_in_past(start, is_all_day):
+        if start_dt and self._is_datetime_in_past(start_dt, is_all_day, current_time):
             event_name = raw_event.get('name', 'Unnamed')
             if is_all_day:
-                print(f"    ⏰ All-day event '{event_name}' is in the past - skipping")
+                logger.info("    ⏰ All-day event '%s' is in the past - skipping", event_name)
             else:
-                print(f"    ⏰ Event '{event_name}' has already happened - skipping")
+                logger.info("    ⏰ Event '%s' has already happened - skipping", event_name)
             return None, 'past'
         
         # Check for events too far in the future (>120 days) unless year is specified
-        if start:
-            try:
-                start_dt = date_parser.parse(start)
-                current_time = datetime.now(timezone.utc)
-                days_in_future = (start_dt - current_time).days
-                
-                # Check if year was explicitly mentioned in the original event text
-                event_text = f"{raw_event.get('name', '')} {raw_event.get('description', '')}"
-                has_explicit_year = any(str(year) in event_text for year in range(2024, 2030))
-                
-                if days_in_future > 120 and not has_explicit_year:
-                    print(f"    📅 Event '{raw_event.get('name', 'Unnamed')}' is more than 120 days in future ({days_in_future} days) without explicit year - likely incorrect date, skipping")
-                    return None, 'validation_failed'
-            except Exception as e:
-                print(f"    ⚠️ Error parsing start_datetime for future limit check: {e}")
+        if start_dt:
+            days_in_future = (start_dt - current_time).days
+            
+            # Check if year was explicitly mentioned in the original event text (name first, description only if needed)
+            if days_in_future > 120 and not (
+                self._YEAR_RE.search(raw_event.get('name') or '') or self._YEAR_RE.search(raw_event.get('description') or '')
+            ):
+                logger.info("    📅 Event '%s' is more than 120 days in future (%d days) without explicit year - likely incorrect date, skipping",
+                            raw_event.get('name', 'Unnamed'), days_in_future)
+                return None, 'validation_failed'
         
-        is_all_day = bool(raw_event.get('is_all_day'))
         event_type = (raw_event.get('type') or 'in-person').lower()
         if event_type not in self.TYPE_ENUM:
             event_type = 'in-person'
@@ -823,7 +1273,7 @@ ONLY extract events from posts that are **ANNOUNCEMENTS** of future activities,
         
         # Require at least a name or description
         if not name and not description:
-            print(f"    ❌ Event has no name or description")
+            logger.info("    ❌ Event has no name or description")
             return None, 'validation_failed'
             
         cleaned = {
@@ -837,166 +1287,271 @@ ONLY extract events from posts that are **ANNOUNCEMENTS** of future activities,
             'type': event_type,
             'url': empty_to_none(raw_event.get('url')),
         }
-        # Categories & tags - use top-level ones from Groq response
-        categories = []
-        if top_level_categories:
-            for c in top_level_categories:
-                if isinstance(c, dict) and c.get('name'):
-                    categories.append(c.get('name', '').lower())
-                elif isinstance(c, str) and c.strip():
-                    categories.append(c.strip().lower())
-            categories = [c if c in self.CATEGORY_ENUM else 'event' for c in categories]
-        
-        tags = []
-        if top_level_tags:
-            for t in top_level_tags:
-                if isinstance(t, dict) and t.get('tag'):
-                    tags.append(self._normalize_tag(t.get('tag', '')))
-                elif isinstance(t, str) and t.strip():
-                    tags.append(self._normalize_tag(t.strip()))
+        # Categories & tags - use the pre-normalized top-level ones from Groq response
+        categories = list(top_level_categories) if top_level_categories else []
+        tags = list(top_level_tags) if top_level_tags else []
         
         # Fallback: also check inside the event in case Groq put them there
         if not categories:
-            for c in raw_event.get('categories', []):
-                if isinstance(c, dict) and c.get('name'):
-                    categories.append(c.get('name', '').lower())
-                elif isinstance(c, str) and c.strip():
-                    categories.append(c.strip().lower())
-            categories = [c if c in self.CATEGORY_ENUM else 'event' for c in categories]
+            categories = self._clean_categories(raw_event.get('categories', []))
         
         if not tags:
-            for t in raw_event.get('event_tags', []):
-                if isinstance(t, dict) and t.get('tag'):
-                    tags.append(self._normalize_tag(t.get('tag', '')))
-                elif isinstance(t, str) and t.strip():
-                    tags.append(self._normalize_tag(t.strip()))
-        
-        # DEDUPLICATE categories and tags to prevent constraint violations
-        categories = list(dict.fromkeys(categories))  # Preserves order while removing duplicates
-        tags = list(dict.fromkeys(tags))  # Preserves order while removing duplicates
+            tags = self._clean_tags(raw_event.get('event_tags', []))
         
         cleaned['categories'] = categories
         cleaned['tags'] = tags
         return cleaned, None
     
     def _get_or_create_category_ids(self, cat_names: List[str]) -> List[str]:
+        """
+        Resolve category names to ids. Names not already cached (together with the rest of CATEGORY_ENUM)
+        cost a single upsert that creates any missing ones and returns every id.
+        """
+        cache = self._category_id_cache
+        uncached = [name for name in dict.fromkeys(cat_names) if name not in cache]
+        
+        if uncached:
+            # Cleaned names always come from CATEGORY_ENUM, so resolve the whole enum on the first miss and later
+            # events find their ids in the cache. ON CONFLICT (name) DO UPDATE returns existing rows as well as
+            # created ones (and covers a concurrent insert), so no separate SELECT is needed
+            lookup = list(dict.fromkeys(uncached + sorted(self.CATEGORY_ENUM.difference(cache))))
+            upsert_res = self.supabase.table('categories').upsert(
+                [{'name': name} for name in lookup], on_conflict='name'
+            ).execute()
+            cache.update({row['name']: row['id'] for row in upsert_res.data or []})
+        
         ids = []
         for name in cat_names:
-            # Try fetch existing category
-            res = self.supabase.table('categories').select('id').eq('name', name).execute()
-            if res.data:
-                ids.append(res.data[0]['id'])
+            if name in cache:
+                ids.append(cache[name])
             else:
-                # Create new category
-                insert_res = self.supabase.table('categories').insert({'name': name}).execute()
-                if insert_res.data:
-                    ids.append(insert_res.data[0]['id'])
-                else:
-                    print(f"      ❌ Failed to create category '{name}'")
+                logger.error("      ❌ Failed to create category '%s'", name)
         return ids
     
-    def _insert_transaction(self, event: Dict[str, Any], profile_id: str, school_id: str, post_id: str = None, caption_id: str = None) -> bool:
-        """Insert event, categories, and tags using Supabase REST API."""
+    EVENT_INSERT_CHUNK_SIZE = 200  # Events per insert_events_with_links RPC / bulk events insert
+    
+    def _queue_event(self, event: Dict[str, Any], profile_id: str, school_id: str, post_id: str = None, caption_id: str = None) -> None:
+        """Queue an event that passed _validate_event (which already rejected past events) for flush_pending_events."""
+        event_data = {
+            'url': event['url'],
+            'name': event['name'],
+            'start_datetime': event['start_datetime'],  # Can be None
+            'end_datetime': event['end_datetime'],  # Can be None
+            'school_id': school_id,
+            'address': event['address'],
+            'location_name': event['location_name'],
+            'description': event['description'],
+            'is_all_day': event['is_all_day'],
+            'type': event['type'],
+            'status': 'active',
+            'profile_id': profile_id,
+            'post_id': post_id,
+            'caption_id': caption_id
+        }
+        self._pending_events.append({'event': event_data, 'cat_names': event['categories'], 'tag_names': event['tags']})
+    
+    def _queue_links(self, event_id: str, item: Dict[str, Any]) -> None:
+        """Queue category and tag links for an event inserted over REST; flush_pending_links writes them in bulk."""
+        cat_ids = self._get_or_create_category_ids(item['cat_names'])
+        self._pending_event_categories.extend({'event_id': event_id, 'category_id': cid} for cid in cat_ids)
+        self._pending_event_tags.extend({'event_id': event_id, 'tag': tag} for tag in item['tag_names'])
+    
+    def _rpc_missing(self, error: Exception) -> bool:
+        """True (and switch to REST for good) if PostgREST says the RPC isn't installed."""
+        if 'PGRST202' not in str(error):  # PGRST202: function not found in the schema cache
+            return False
+        logger.warning("    ⚠️ insert_event(s)_with_links RPC not installed - using per-table REST inserts (see supabase_migrations.sql)")
+        self._links_rpc_available = False
+        return True
+    
+    def _insert_transaction(self, item: Dict[str, Any]) -> bool:
+        """
+        Insert a single queued event with its categories and tags. Uses the insert_event_with_links RPC
+        (one request, one transaction) when installed, otherwise the REST API with links queued for flush_pending_links.
+        Fallback for when a whole chunk can't be inserted at once.
+        """
         try:
-            # FINAL SAFETY CHECK: Absolutely ensure no past events get inserted
-            start_dt = event['start_datetime']  # Can be None
-            if start_dt and self._is_event_in_past(start_dt, event.get('is_all_day', False)):
-                print(f"    🚫 FINAL SAFETY: Blocking insertion of past event '{event['name']}' - this should not happen!")
-                return False
-            
-            event_data = {
-                'url': event['url'],
-                'name': event['name'],
-                'start_datetime': start_dt,  # Can be None
-                'end_datetime': event['end_datetime'],  # Can be None
-                'school_id': school_id,
-                'address': event['address'],
-                'location_name': event['location_name'],
-                'description': event['description'],
-                'is_all_day': event['is_all_day'],
-                'type': event['type'],
-                'status': 'active',
-                'profile_id': profile_id,
-                'post_id': post_id,
-                'caption_id': caption_id
-            }
+            if self._links_rpc_available:
+                try:
+                    self.supabase.rpc('insert_event_with_links', item).execute()
+                    return True
+                except Exception as e:
+                    if not self._rpc_missing(e):
+                        raise
             
-            insert_res = self.supabase.table('events').insert(event_data).execute()
+            insert_res = self.supabase.table('events').insert(item['event']).execute()
             
             if not insert_res.data:
-                print("Failed to insert event via REST - no data returned")
+                logger.error("Failed to insert event via REST - no data returned")
                 return False
-            event_id = insert_res.data[0]['id']
-            # Categories
-            cat_ids = self._get_or_create_category_ids(event['categories'])
-            
-            # Link categories and tags with simplified error handling
-            for cid in cat_ids:
-                try:
-                    self.supabase.table('event_categories').insert({'event_id': event_id, 'category_id': cid}).execute()
-                except Exception as e:
-                    if "duplicate key" not in str(e):  # Only log non-duplicate errors
-                        print(f"    ❌ Failed to link category {cid}: {e}")
-                        raise
-                
-            # Tags
-            for tag in event['tags']:
-                try:
-                    self.supabase.table('event_tags').insert({'event_id': event_id, 'tag': tag}).execute()
-                except Exception as e:
-                    if "duplicate key" not in str(e):  # Only log non-duplicate errors
-                        print(f"    ❌ Failed to add tag '{tag}': {e}")
-                        raise
-                
-            print(f"    🎉 Event insertion complete!")
+            self._queue_links(insert_res.data[0]['id'], item)
             return True
         except Exception as e:
-            print(f"    ❌ Event insertion failed: {e}")
+            # Traceback is only formatted when DEBUG logging is enabled
+            logger.error("    ❌ Event insertion failed for '%s': %s: %s", item['event']['name'], type(e).__name__, e,
+                         exc_info=logger.isEnabledFor(logging.DEBUG))
             return False
     
+    @staticmethod
+    def _rejected_before_commit(error: Exception) -> bool:
+        """
+        True if PostgREST answered with an error, so the statement was rolled back and retrying can't duplicate rows:
+        a database/PostgREST error code (SQLSTATE or PGRST*), or a plain 4xx. Timeouts, dropped connections and
+        gateway 5xx responses are ambiguous - the insert may have committed.
+        """
+        if not isinstance(error, APIError):
+            return False
+        return isinstance(error.code, str) or (isinstance(error.code, int) and 400 <= error.code < 500)
+    
+    def _chunk_failed(self, chunk: List[Dict[str, Any]], error: Exception, what: str) -> int:
+        """Retry a failed chunk one event at a time if that's safe, else leave its posts unprocessed for the next run."""
+        if self._rejected_before_commit(error):
+            logger.warning("    ❌ %s failed, retrying one by one: %s: %s", what, type(error).__name__, error)
+            return sum(self._insert_transaction(item) for item in chunk)
+        logger.error("    ❌ %s failed and may have been committed - not retrying; its posts stay unprocessed: %s: %s",
+                     what, type(error).__name__, error)
+        self._unflushed_post_ids.update(item['event']['post_id'] for item in chunk)
+        return 0
+    
+    def _insert_event_chunk(self, chunk: List[Dict[str, Any]]) -> int:
+        """
+        Insert a chunk of queued events in one request, falling back to one event at a time when the request was
+        cleanly rejected (see _chunk_failed). Returns events inserted.
+        """
+        if self._links_rpc_available:
+            try:
+                # The function inserts each event in its own subtransaction and returns how many succeeded
+                res = self.supabase.rpc('insert_events_with_links', {'events': chunk}).execute()
+                return res.data or 0
+            except Exception as e:
+                if not self._rpc_missing(e):
+                    return self._chunk_failed(chunk, e, "Batch event insert")
+        
+        try:
+            # One multi-row INSERT; PostgREST returns the rows in input order
+            res = self.supabase.table('events').insert([item['event'] for item in chunk]).execute()
+        except Exception as e:
+            return self._chunk_failed(chunk, e, "Bulk event insert")
+        rows = res.data or []
+        for item, row in zip(chunk, rows):
+            self._queue_links(row['id'], item)
+        return len(rows)
+    
+    def flush_pending_events(self) -> int:
+        """Insert every queued event (and its links) with one request per EVENT_INSERT_CHUNK_SIZE events."""
+        pending, self._pending_events = self._pending_events, []
+        inserted = 0
+        for start in range(0, len(pending), self.EVENT_INSERT_CHUNK_SIZE):
+            inserted += self._insert_event_chunk(pending[start:start + self.EVENT_INSERT_CHUNK_SIZE])
+        if pending:
+            logger.info("💾 Inserted %d/%d events", inserted, len(pending))
+        return inserted
+    
+    def _bulk_insert(self, table: str, rows: List[Dict[str, Any]], on_conflict: str = None) -> int:
+        """
+        Insert rows into a table in chunks of LINK_INSERT_CHUNK_SIZE. Returns the number of rows written.
+        Uses return=minimal so PostgREST doesn't serialize every inserted row back to us.
+        With `on_conflict` (the table's unique columns), rows that already exist are skipped server-side.
+        """
+        written = 0
+        for start in range(0, len(rows), self.LINK_INSERT_CHUNK_SIZE):
+            chunk = rows[start:start + self.LINK_INSERT_CHUNK_SIZE]
+            try:
+                if on_conflict:
+                    self.supabase.table(table).upsert(
+                        chunk, on_conflict=on_conflict, ignore_duplicates=True, returning=ReturnMethod.minimal
+                    ).execute()
+                else:
+                    self.supabase.table(table).insert(chunk, returning=ReturnMethod.minimal).execute()
+                written += len(chunk)
+            except Exception as e:
+                if on_conflict and '42P10' in str(e):  # 42P10: no unique constraint matches on_conflict
+                    logger.warning("    ⚠️ %s has no unique (%s) constraint - inserting without ON CONFLICT (see supabase_migrations.sql)", table, on_conflict)
+                    return written + self._bulk_insert(table, rows[start:])
+                if "duplicate key" in str(e):
+                    # A duplicate aborts the whole chunk, so retry row by row to keep the rest
+                    for row in chunk:
+                        try:
+                            self.supabase.table(table).insert(row, returning=ReturnMethod.minimal).execute()
+                            written += 1
+                        except Exception as row_error:
+                            if "duplicate key" not in str(row_error):
+                                logger.error("    ❌ Failed to insert into %s: %s", table, row_error)
+                else:
+                    logger.error("    ❌ Failed to insert %d rows into %s: %s", len(chunk), table, e)
+        return written
+    
+    def flush_pending_links(self) -> None:
+        """Write all queued event_categories and event_tags rows with one request per chunk."""
+        categories, self._pending_event_categories = self._pending_event_categories, []
+        tags, self._pending_event_tags = self._pending_event_tags, []
+        # Drop repeated (event_id, tag) pairs before sending so the upsert never has to skip them
+        tags = list({(row['event_id'], row['tag']): row for row in tags}.values())
+        if categories:
+            written = self._bulk_insert('event_categories', categories, on_conflict='event_id,category_id')
+            logger.info("🔗 Linked %d/%d event categories", written, len(categories))
+        if tags:
+            written = self._bulk_insert('event_tags', tags, on_conflict='event_id,tag')
+            logger.info("🏷️ Added %d/%d event tags", written, len(tags))
+    
+    BATCH_CLOCK_REFRESH_SECONDS = 30
+    
+    def _batch_clock(self) -> datetime:
+        """
+        UTC "now" for event validation, read once and reused for BATCH_CLOCK_REFRESH_SECONDS so every event in a
+        batch is checked against the same cutoff. run_extraction_batch resets it at the start of each batch.
+        """
+        read_at, now = self._batch_now
+        if now is None or time.monotonic() - read_at > self.BATCH_CLOCK_REFRESH_SECONDS:
+            now = datetime.now(timezone.utc)
+            self._batch_now = (time.monotonic(), now)
+        return now
+    
     def validate_and_insert(self, extracted_data: Dict[str, Any], post_data: Dict[str, Any], posted_at: datetime = None) -> bool:
-        """Validate Groq output and insert into DB. Returns True on success."""
-        profile_id = post_data.get('profiles', {}).get('id')
-        school_id = post_data.get('profiles', {}).get('school_id')
+        """
+        Validate Groq output and queue the events for insertion. Returns True if any event was queued.
+        Queued events are written by flush_pending_events (run_extraction_batch does this once per batch).
+        """
+        profile = post_data.get('profiles') or {}
+        profile_id = profile.get('id')
+        school_id = profile.get('school_id')
+        # School name/address come embedded with the profile from fetch_unprocessed_posts - no per-event query
+        school = profile.get('schools') or {}
         post_id = post_data.get('id')
         caption_id = post_data.get('caption_path')  # Use caption_path as caption identifier
         events = extracted_data.get('events', [])
         
-        # Get categories and tags from top level (Groq returns them here, not inside each event)
-        top_level_categories = extracted_data.get('categories', [])
-        top_level_tags = extracted_data.get('event_tags', [])
-        print(f"🔍 Validating {len(events)} events...")
+        # Get categories and tags from top level (Groq returns them here, not inside each event).
+        # Normalize once per post rather than once per event.
+        top_level_categories = self._clean_categories(extracted_data.get('categories', []))
+        top_level_tags = self._clean_tags(extracted_data.get('event_tags', []))
+        logger.info("🔍 Validating %d events...", len(events))
         
         success_any = False
+        now = self._batch_clock()
         past_count = 0
         validation_failed_count = 0
         for i, raw_event in enumerate(events, 1):
-            print(f"  Validating event {i}: {raw_event.get('name', 'Unnamed')}")
-            cleaned, failure_reason = self._validate_event(raw_event, top_level_categories, top_level_tags, posted_at)
+            logger.debug("  Validating event %d: %s", i, raw_event.get('name', 'Unnamed'))
+            cleaned, failure_reason = self._validate_event(raw_event, top_level_categories, top_level_tags, posted_at, now)
             if not cleaned:
                 if failure_reason == 'past':
-                    print(f"  ⏰ Event {i} is in the past – skipping.")
+                    logger.debug("  ⏰ Event %d is in the past – skipping.", i)
                     past_count += 1
                 elif failure_reason == 'validation_failed':
-                    print(f"  ❌ Validation failed for event {i} – skipping.")
+                    logger.debug("  ❌ Validation failed for event %d – skipping.", i)
                     validation_failed_count += 1
                 else:
-                    print(f"  ❌ Unknown issue with event {i} – skipping.")
+                    logger.warning("  ❌ Unknown issue with event %d – skipping.", i)
                     validation_failed_count += 1
                 continue
             # Address from schools table if location matches
-            if cleaned['location_name'] and school_id:
-                school_res = self.supabase.table('schools').select('name,address').eq('id', school_id).single().execute()
-                if school_res.data and cleaned['location_name'].lower() == school_res.data['name'].lower():
-                    cleaned['address'] = school_res.data['address']
-            # Insert transaction
-            print(f"  💾 Attempting to insert event: {cleaned['name']}")
-            inserted = self._insert_transaction(cleaned, profile_id, school_id, post_id, caption_id)
-            if inserted:
-                print(f"  ✅ Successfully inserted: {cleaned['name']}")
-            else:
-                print(f"  ❌ Failed to insert: {cleaned['name']}")
-            success_any = success_any or inserted
+            if cleaned['location_name'] and school.get('name') and cleaned['location_name'].lower() == school['name'].lower():
+                cleaned['address'] = school.get('address')
+            # Queue for the batch insert
+            self._queue_event(cleaned, profile_id, school_id, post_id, caption_id)
+            logger.info("  ✅ Queued for insertion: %s", cleaned['name'])
+            success_any = True
         
         # Print validation summary
         total_skipped = past_count + validation_failed_count
@@ -1006,33 +1561,53 @@ ONLY extract events from posts that are **ANNOUNCEMENTS** of future activities,
                 summary_parts.append(f"{past_count} past events")
             if validation_failed_count > 0:
                 summary_parts.append(f"{validation_failed_count} validation failures")
-            print(f"📊 Validation summary: {total_skipped} events skipped ({', '.join(summary_parts)})")
+            logger.info("📊 Validation summary: %d events skipped (%s)", total_skipped, ', '.join(summary_parts))
         
         return success_any
 
-    def process_post(self, post_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Process a single post through the complete extraction pipeline."""
-        print(f"Processing post from @{post_data.get('profiles', {}).get('username', 'unknown')}")
+    async def process_post(self, post_data: Dict[str, Any], groq_slots: Optional[asyncio.Semaphore] = None) -> Dict[str, Any]:
+        """
+        Process a single post through the complete extraction pipeline.
+        Does not mark the post as processed - callers do that (run_extraction_batch batches it).
+        `groq_slots` bounds only the prepare + Groq stage; validation then queues the events for the batch insert.
+        """
+        logger.debug("Processing post from @%s", post_data.get('profiles', {}).get('username', 'unknown'))
         
-        # Prepare request for Groq
-        request_data = self.prepare_groq_request(post_data)
+        async with groq_slots or contextlib.nullcontext():
+            # Prepare request for Groq
+            request_data = await self.prepare_groq_request(post_data)
+            
+            # Caption-only posts whose caption, bio and date already came back with no events skip the Groq call
+            no_event_key = self._no_event_key(request_data)
+            if no_event_key in self._no_event_hashes:
+                logger.info("⏭️ Same post content previously had no events - skipping Groq")
+                return {
+                    'post_id': post_data.get('id'),
+                    'username': request_data['username'],
+                    'extraction_success': False,
+                    'extracted_data': None
+                }
+            
+            # Extract events using Groq
+            extracted_data = await self.extract_events_with_groq(request_data)
         
-        # Extract events using Groq
-        extracted_data = self.extract_events_with_groq(request_data)
+        if extracted_data and no_event_key and not extracted_data.get('events'):
+            self._no_event_hashes.add(no_event_key)
+            self._new_no_event_hashes.append(no_event_key)
         
         if extracted_data:
-            print(f"✅ Extraction successful! Events found: {len(extracted_data.get('events', []))}")
-            print(f"📊 Extraction confidence: {extracted_data.get('extraction_confidence', 'N/A')}")
-            # Print extracted events summary
-            for i, event in enumerate(extracted_data.get('events', []), 1):
-                print(f"  Event {i}: {event.get('name', 'Unnamed')} - {event.get('start_datetime', 'No date')}")
+            logger.info("✅ Extraction successful! Events found: %d", len(extracted_data.get('events', [])))
+            logger.info("📊 Extraction confidence: %s", extracted_data.get('extraction_confidence', 'N/A'))
+            # Log extracted events summary (the loop is skipped entirely unless DEBUG is enabled)
+            if logger.isEnabledFor(logging.DEBUG):
+                for i, event in enumerate(extracted_data.get('events', []), 1):
+                    logger.debug("  Event %d: %s - %s", i, event.get('name', 'Unnamed'), event.get('start_datetime', 'No date'))
             
+            # Validation only queues rows; the database writes happen once per batch in flush_pending_events
             inserted = self.validate_and_insert(extracted_data, post_data, request_data.get('posted_at'))
-            # Always mark post as processed after Groq processing, regardless of insertion success
-            self.mark_post_processed(post_data['id'])
             
             if inserted:
-                print("💾 ✅ Successfully inserted into database")
+                logger.info("💾 ✅ Events queued for insertion")
             # Note: Don't log "failed to insert" here as it might be due to past events (intentional skip)
                 
             return {
@@ -1042,9 +1617,7 @@ ONLY extract events from posts that are **ANNOUNCEMENTS** of future activities,
                 'extracted_data': extracted_data
             }
         else:
-            print("❌ Failed to extract events - no data returned from Groq")
-            # Mark post processed even when no data returned from Groq to avoid reprocessing
-            self.mark_post_processed(post_data['id'])
+            logger.warning("❌ Failed to extract events - no data returned from Groq")
             return {
                 'post_id': post_data.get('id'),
                 'username': request_data['username'],
@@ -1052,14 +1625,83 @@ ONLY extract events from posts that are **ANNOUNCEMENTS** of future activities,
                 'extracted_data': None
             }
     
-    def mark_post_processed(self, post_id: str) -> bool:
-        """Mark a post as processed in the database."""
+    @staticmethod
+    def _no_event_key(request_data: Dict[str, Any]) -> Optional[str]:
+        """
+        Hash of everything Groq's answer depends on for a caption-only post: the normalized caption and bio, and the
+        post date (relative dates like "tomorrow" and past-event filtering hinge on it). Boilerplate captions
+        ("Link in bio!") reposted the same day share a key; the same wording on another day goes back to Groq.
+        None (never cached) without a caption or date, or when the post has images - image paths are unique per
+        post, so such a key could never match again.
+        """
+        caption = request_data.get('caption')
+        posted_at = request_data.get('posted_at')
+        if not caption or not posted_at or request_data.get('image_paths'):
+            return None
+        parts = [
+            ' '.join(caption.lower().split()),
+            ' '.join((request_data.get('bio') or '').lower().split()),
+            posted_at.date().isoformat(),
+        ]
+        return hashlib.sha1('\x1f'.join(parts).encode('utf-8')).hexdigest()
+    
+    def load_no_event_captions(self) -> None:
+        """
+        Load the hashes of captions known to contain no events (see _no_event_key), one page at a time.
+        Only rows recorded since the processing cutoff: the key includes the post date, so older rows belong to
+        posts that are retired unprocessed anyway and can't match.
+        """
+        cutoff = self._processing_cutoff()
+        loaded = 0
         try:
-            result = self.supabase.table('posts').update({'processed': True}).eq('id', post_id).execute()
-            return bool(result.data)
+            while True:
+                page = self.supabase.table('no_event_captions').select('hash').gte('created_at', cutoff).order('hash').range(
+                    loaded, loaded + self.FETCH_PAGE_SIZE - 1
+                ).execute().data or []
+                loaded += len(page)
+                self._no_event_hashes.update(row['hash'] for row in page)
+                if len(page) < self.FETCH_PAGE_SIZE:
+                    break
+            logger.info("⏭️ Loaded %d no-event caption hashes", len(self._no_event_hashes))
         except Exception as e:
-            print(f"Error marking post {post_id} as processed: {e}")
-            return False
+            logger.warning("⚠️ Could not load no_event_captions, every post goes to Groq (see supabase_migrations.sql): %s", e)
+    
+    def flush_no_event_captions(self) -> None:
+        """Persist the no-event caption hashes found in this batch, and prune the ones older than the processing cutoff."""
+        hashes, self._new_no_event_hashes = self._new_no_event_hashes, []
+        if hashes:
+            written = self._bulk_insert('no_event_captions', [{'hash': h} for h in dict.fromkeys(hashes)], on_conflict='hash')
+            logger.info("⏭️ Recorded %d new no-event captions", written)
+        try:
+            pruned = self.supabase.rpc('prune_no_event_captions', {'cutoff': self._processing_cutoff()}).execute().data
+            if pruned:
+                logger.info("⏭️ Pruned %d expired no-event captions", pruned)
+        except Exception as e:
+            logger.warning("⚠️ Could not prune no_event_captions (see supabase_migrations.sql): %s", e)
+    
+    def mark_post_processed(self, post_id: str) -> bool:
+        """Mark a single post as processed. Batch callers should collect ids and use mark_posts_processed."""
+        return self.mark_posts_processed([post_id])
+    
+    def mark_posts_processed(self, post_ids: List[str]) -> bool:
+        """
+        Mark many posts as processed. Uses a single UPDATE ... WHERE id = ANY(...) over the direct connection,
+        otherwise one REST UPDATE ... WHERE id IN (...) per POST_ID_CHUNK_SIZE ids.
+        """
+        if post_ids and self._pg_execute("UPDATE posts SET processed = true WHERE id = ANY(%s::uuid[])", (list(post_ids),)):
+            logger.info("✅ Marked %d posts as processed", len(post_ids))
+            return True
+        success = True
+        for start in range(0, len(post_ids), self.POST_ID_CHUNK_SIZE):
+            chunk = post_ids[start:start + self.POST_ID_CHUNK_SIZE]
+            try:
+                self.supabase.table('posts').update({'processed': True}, returning=ReturnMethod.minimal).in_('id', chunk).execute()
+            except Exception as e:
+                logger.error("Error marking %d posts as processed: %s", len(chunk), e)
+                success = False
+        if post_ids and success:
+            logger.info("✅ Marked %d posts as processed", len(post_ids))
+        return success
     
     def get_rate_limit_stats(self) -> Dict[str, Any]:
         """Get current rate limiting statistics."""
@@ -1080,64 +1722,126 @@ ONLY extract events from posts that are **ANNOUNCEMENTS** of future activities,
         """Reset rate limiting usage tracking. Use with caution."""
         self.rate_limiter.reset_usage()
 
-    def run_extraction_batch(self, batch_size: int = None) -> List[Dict[str, Any]]:
-        """Run event extraction on all unprocessed posts (or limited batch if specified)."""
+    def _log_progress(self, label: str, include_rpd: bool = True, level: int = logging.INFO):
+        """Log rate limit usage as one record; the stats aren't even collected if `level` is disabled."""
+        if not logger.isEnabledFor(level):
+            return
+        stats = self.get_rate_limit_stats()
+        lines = [label]
+        keys = ('requests_per_minute', 'requests_per_day', 'tokens_per_minute') if include_rpd else ('requests_per_minute', 'tokens_per_minute')
+        for key in keys:
+            usage = stats[key]
+            lines.append(f"   {self._PROGRESS_LABELS[key]}: {usage['current']}/{usage['threshold']} ({usage['percentage']}%)")
+        logger.log(level, "\n".join(lines))
+    
+    _PROGRESS_LABELS = {'requests_per_minute': 'RPM', 'requests_per_day': 'RPD', 'tokens_per_minute': 'TPM'}
+    PROGRESS_INTERVAL_SECONDS = 30
+    
+    async def _log_progress_periodically(self, counter: Dict[str, int]):
+        """Report usage every PROGRESS_INTERVAL_SECONDS until cancelled, independent of how fast posts finish."""
+        while True:
+            await asyncio.sleep(self.PROGRESS_INTERVAL_SECONDS)
+            self._log_progress(f"📊 Current usage after {counter['completed']} posts:", include_rpd=False)
+    
+    async def run_extraction_batch(self, batch_size: int = None, concurrency: int = None) -> List[Dict[str, Any]]:
+        """
+        Run event extraction on all unprocessed posts (or limited batch if specified).
+        Posts are processed concurrently, with up to `concurrency` in the Groq stage - by default about one
+        second's worth of the RPM threshold. The rate limiter still gates every request either way.
+        """
         if batch_size:
-            print(f"🚀 Starting event extraction batch (size: {batch_size})")
+            logger.info("🚀 Starting event extraction batch (size: %d)", batch_size)
         else:
-            print("🚀 Starting event extraction for all unprocessed posts")
+            logger.info("🚀 Starting event extraction for all unprocessed posts")
         
         # Show initial rate limit stats
-        stats = self.get_rate_limit_stats()
-        print(f"📊 Starting rate limit usage:")
-        print(f"   RPM: {stats['requests_per_minute']['current']}/{stats['requests_per_minute']['threshold']} ({stats['requests_per_minute']['percentage']}%)")
-        print(f"   RPD: {stats['requests_per_day']['current']}/{stats['requests_per_day']['threshold']} ({stats['requests_per_day']['percentage']}%)")
-        print(f"   TPM: {stats['tokens_per_minute']['current']}/{stats['tokens_per_minute']['threshold']} ({stats['tokens_per_minute']['percentage']}%)")
+        self._log_progress("📊 Starting rate limit usage:")
+        
+        # Start the batch with a fresh validation clock, and drop images/URLs a previous batch left unused
+        self._batch_now = (0.0, None)
+        self._image_cache.clear()
+        self._image_urls.clear()
         
         # Fetch unprocessed posts
-        posts = self.fetch_unprocessed_posts(batch_size)
+        posts = await run_blocking(self.fetch_unprocessed_posts, batch_size)
+        if posts and not self._no_event_hashes:
+            await run_blocking(self.load_no_event_captions)
         
         if not posts:
-            print("ℹ️  No unprocessed posts found")
+            logger.info("ℹ️  No unprocessed posts found")
             return []
         
-        print(f"📊 Found {len(posts)} unprocessed posts")
+        logger.info("📊 Found %d unprocessed posts", len(posts))
         
-        results = []
-        for i, post in enumerate(posts, 1):
+        # Phase 1: at most `concurrency` posts are in the prepare + Groq stage; each finished extraction queues its
+        # validated events and frees its slot for the next post. Phase 2 (below) writes the whole batch at once.
+        concurrency = max(1, concurrency or self.rate_limiter.RPM_THRESHOLD // 60)
+        groq_slots = asyncio.Semaphore(concurrency)
+        processed_ids = []
+        progress = {'completed': 0}
+        
+        async def run_one(i: int, post: Dict[str, Any]) -> Dict[str, Any]:
             try:
-                print(f"\n📝 Processing post {i}/{len(posts)} from @{post.get('profiles', {}).get('username', 'unknown')}")
+                logger.info("\n📝 Processing post %d/%d from @%s", i, len(posts), post.get('profiles', {}).get('username', 'unknown'))
                 
                 # Process the post
-                result = self.process_post(post)
-                results.append(result)
+                result = await self.process_post(post, groq_slots)
                 
-                # Post is already marked as processed in process_post method
-                    
-                # Show updated rate limit stats every 5 posts
-                if i % 5 == 0:
-                    stats = self.get_rate_limit_stats()
-                    print(f"📊 Current usage after {i} posts:")
-                    print(f"   RPM: {stats['requests_per_minute']['current']}/{stats['requests_per_minute']['threshold']} ({stats['requests_per_minute']['percentage']}%)")
-                    print(f"   TPM: {stats['tokens_per_minute']['current']}/{stats['tokens_per_minute']['threshold']} ({stats['tokens_per_minute']['percentage']}%)")
-                    
+                # Always mark post as processed after Groq processing, regardless of insertion success
+                processed_ids.append(post['id'])
             except Exception as e:
-                print(f"Error processing post {post.get('id')}: {e}")
-                results.append({
+                logger.error("Error processing post %s: %s", post.get('id'), e)
+                result = {
                     'post_id': post.get('id'),
                     'username': post.get('profiles', {}).get('username', 'unknown'),
                     'extraction_success': False,
                     'error': str(e)
-                })
+                }
+            
+            progress['completed'] += 1
+            return result
+        
+        logger.info("⚡ Processing with up to %d posts in the Groq stage", concurrency)
+        # Rate limit usage is reported on a timer rather than every N posts
+        reporter = asyncio.create_task(self._log_progress_periodically(progress))
+        tasks = []
+        try:
+            # run_one handles its own errors, so the group only aborts on cancellation (e.g. Ctrl+C)
+            async with asyncio.TaskGroup() as posts_group:
+                # Posts are fed in windows (PREFETCH_WINDOW_POSTS, or `concurrency` if larger so the Groq stage never
+                # idles): a window's captions, bios and images are fetched while the previous window is in the Groq
+                # stage, and no further ahead than that, so memory stays bounded by two windows however large the
+                # backlog is
+                window_size = max(self.PREFETCH_WINDOW_POSTS, concurrency)
+                previous_window: List[asyncio.Task] = []
+                for start in range(0, len(posts), window_size):
+                    window = posts[start:start + window_size]
+                    self.prefetch_post_texts(window)
+                    await self.prefetch_post_images(window)
+                    current_window = [
+                        posts_group.create_task(run_one(i, post)) for i, post in enumerate(window, start + 1)
+                    ]
+                    tasks.extend(current_window)
+                    if previous_window:
+                        await asyncio.wait(previous_window)
+                    previous_window = current_window
+        finally:
+            reporter.cancel()
+        results = [task.result() for task in tasks]
+        
+        # Insert every event in the batch at once, then the category/tag links the REST path queued
+        await run_blocking(self.flush_pending_events)
+        await run_blocking(self.flush_pending_links)
+        await run_blocking(self.flush_no_event_captions)
+        
+        # Mark every post that went through Groq as processed in one UPDATE, except those whose events may not be saved
+        unflushed, self._unflushed_post_ids = self._unflushed_post_ids, set()
+        await run_blocking(self.mark_posts_processed, [post_id for post_id in processed_ids if post_id not in unflushed])
         
         # Show final rate limit stats
-        final_stats = self.get_rate_limit_stats()
-        print(f"\n📊 Final rate limit usage:")
-        print(f"   RPM: {final_stats['requests_per_minute']['current']}/{final_stats['requests_per_minute']['threshold']} ({final_stats['requests_per_minute']['percentage']}%)")
-        print(f"   RPD: {final_stats['requests_per_day']['current']}/{final_stats['requests_per_day']['threshold']} ({final_stats['requests_per_day']['percentage']}%)")
-        print(f"   TPM: {final_stats['tokens_per_minute']['current']}/{final_stats['tokens_per_minute']['threshold']} ({final_stats['tokens_per_minute']['percentage']}%)")
+        self._log_progress("\n📊 Final rate limit usage:")
         
-        print(f"🏁 Batch complete. Processed {len(results)} posts")
+        logger.info("🏁 Batch complete. Processed %d posts", len(results))
         return results
 
 def main():
@@ -1169,18 +1873,24 @@ def main():
     
     # All Groq API calls are automatically rate-limited - no manual intervention needed!
     """
+    # Hot-path messages go through logging; set LOG_LEVEL=DEBUG for per-event/per-request detail, WARNING for quiet runs
+    log_listener = start_log_listener(os.getenv("LOG_LEVEL", "INFO").upper())
+    
     try:
         extractor = EventExtractor()
         
         # Get batch size from command line args or default to all posts (None)
         batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else None
         
+        # Optional cap on concurrent Groq requests (defaults to RPM threshold / 60)
+        concurrency = int(os.getenv("GROQ_CONCURRENCY", "0")) or None
+        
         # Run extraction with automatic rate limiting
-        results = extractor.run_extraction_batch(batch_size)
+        results = asyncio.run(extractor.run_extraction_batch(batch_size, concurrency))
         
         # Print summary
         successful = sum(1 for r in results if r['extraction_success'])
-        print(f"\n📈 Summary: {successful}/{len(results)} posts successfully processed")
+        logger.info("\n📈 Summary: %d/%d posts successfully processed", successful, len(results))
         
         # Return results for potential use by calling scripts
         return results
@@ -1188,6 +1898,9 @@ def main():
     except Exception as e:
         print(f"❌ Fatal error: {e}")
         sys.exit(1)
+    finally:
+        # Drain queued log records before exiting
+        log_listener.stop()
 
 if __name__ == "__main__":
     main()
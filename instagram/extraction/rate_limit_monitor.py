@@ -6,9 +6,9 @@ This script provides utilities for monitoring and managing Groq API rate limits
 without running the full event extraction pipeline.
 """
 
+import os
 import sys
-import json
-from ai import EventExtractor
+import orjson
 from datetime import datetime
 
 
@@ -125,8 +125,8 @@ def export_stats(extractor, filename=None):
     if not filename:
         filename = f"groq_rate_limits_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
     
-    with open(filename, 'w') as f:
-        json.dump(stats, f, indent=2)
+    with open(filename, 'wb') as f:
+        f.write(orjson.dumps(stats, option=orjson.OPT_INDENT_2))
     
     print(f"📁 Statistics exported to: {filename}")
 
@@ -144,8 +144,13 @@ def main():
         sys.exit(1)
     
     command = sys.argv[1].lower()
+    log_listener = None
     
     try:
+        # Imported here so the usage text doesn't wait on groq/supabase/PIL imports
+        from ai import EventExtractor, start_log_listener
+        # The extractor logs through a queue; start the same listener ai.py's main() does so its output is shown
+        log_listener = start_log_listener(os.getenv("LOG_LEVEL", "INFO").upper())
         extractor = EventExtractor()
         
         if command == "stats":
@@ -174,6 +179,10 @@ def main():
     except Exception as e:
         print(f"❌ Error: {e}")
         sys.exit(1)
+    finally:
+        # Drain queued log records before exiting
+        if log_listener:
+            log_listener.stop()
 
 
 if __name__ == "__main__":
@@ -6,7 +6,6 @@ This allows posts to be reprocessed by the AI extraction pipeline.
 
 import os
 import sys
-from supabase import create_client, Client
 from dotenv import load_dotenv
 
 def main():
@@ -27,14 +26,18 @@ def main():
         print("Please check your .env file.")
         sys.exit(1)
     
+    # Deferred until the environment checks pass; the supabase client stack is slow to import
+    from supabase import create_client, Client
+    from postgrest.types import CountMethod, ReturnMethod
+    
     try:
         supabase: Client = create_client(supabase_url, supabase_key)
         
-        # Get count of posts and events before reset
-        posts_count_result = supabase.table('posts').select('id', count='exact').execute()
+        # Get count of posts and events before reset (head=True: only the count comes back, no rows)
+        posts_count_result = supabase.table('posts').select('id', count=CountMethod.exact, head=True).execute()
         total_posts = posts_count_result.count if posts_count_result.count is not None else 0
         
-        events_count_result = supabase.table('events').select('id', count='exact').execute()
+        events_count_result = supabase.table('events').select('id', count=CountMethod.exact, head=True).execute()
         total_events = events_count_result.count if events_count_result.count is not None else 0
         
         print(f"📊 Found {total_posts} posts and {total_events} events in the database")
@@ -55,10 +58,13 @@ def main():
         # Reset all posts to processed = False
         if total_posts > 0:
             print("\n🔄 Resetting posts...")
-            posts_result = supabase.table('posts').update({'processed': False}).gte('created_at', '1900-01-01').execute()
+            # return=minimal + count=exact: PostgREST reports how many rows changed without sending them back
+            posts_result = supabase.table('posts').update(
+                {'processed': False}, count=CountMethod.exact, returning=ReturnMethod.minimal
+            ).gte('created_at', '1900-01-01').execute()
             
-            if posts_result.data:
-                updated_count = len(posts_result.data)
+            if posts_result.count:
+                updated_count = posts_result.count
                 print(f"✅ Successfully reset {updated_count} posts to unprocessed state")
             else:
                 print("⚠️  No posts were updated. They may already be unprocessed.")
@@ -66,10 +72,12 @@ def main():
         # Delete all events (cascade will handle related tables)
         if total_events > 0:
             print("\n🗑️  Deleting all events (with cascade)...")
-            events_result = supabase.table('events').delete().gte('created_at', '1900-01-01').execute()
+            events_result = supabase.table('events').delete(
+                count=CountMethod.exact, returning=ReturnMethod.minimal
+            ).gte('created_at', '1900-01-01').execute()
             
-            if events_result.data:
-                deleted_count = len(events_result.data)
+            if events_result.count:
+                deleted_count = events_result.count
                 print(f"✅ Successfully deleted {deleted_count} events and all related data")
             else:
                 print("⚠️  No events were deleted. They may not exist.")
@@ -3,7 +3,7 @@
 
 CREATE TABLE public.categories (
   id uuid NOT NULL DEFAULT uuid_generate_v4(),
-  name text NOT NULL,
+  name text NOT NULL UNIQUE,
   CONSTRAINT categories_pkey PRIMARY KEY (id)
 );
 CREATE TABLE public.event_attendees (
@@ -52,6 +52,7 @@ CREATE TABLE public.event_tags (
   event_id uuid,
   tag text,
   CONSTRAINT event_tags_pkey PRIMARY KEY (id),
+  CONSTRAINT event_tags_event_id_tag_key UNIQUE (event_id, tag),
   CONSTRAINT event_tags_event_id_fkey FOREIGN KEY (event_id) REFERENCES public.events(id)
 );
 CREATE TABLE public.events (
@@ -86,6 +87,11 @@ CREATE TABLE public.images (
   CONSTRAINT images_pkey PRIMARY KEY (id),
   CONSTRAINT fk_images_event FOREIGN KEY (event_id) REFERENCES public.events(id)
 );
+CREATE TABLE public.no_event_captions (
+  hash text NOT NULL,
+  created_at timestamp with time zone DEFAULT now(),
+  CONSTRAINT no_event_captions_pkey PRIMARY KEY (hash)
+);
 CREATE TABLE public.post_images (
   id uuid NOT NULL DEFAULT uuid_generate_v4(),
   post_id uuid NOT NULL,
@@ -0,0 +1,120 @@
+-- Migrations to apply to the Supabase database (SQL editor or psql), oldest first.
+-- supabase.sql reflects the schema after these have been applied.
+
+-- 1. Unique category names so _get_or_create_category_ids can upsert with ON CONFLICT (name).
+--    Duplicate categories are merged into the lowest id first.
+CREATE TEMP TABLE category_duplicates AS
+SELECT dup.id AS dup_id, keep.id AS keep_id
+FROM public.categories dup
+JOIN (SELECT DISTINCT ON (name) id, name FROM public.categories ORDER BY name, id) keep
+  ON keep.name = dup.name AND keep.id <> dup.id;
+
+INSERT INTO public.event_categories (event_id, category_id)
+SELECT ec.event_id, d.keep_id
+FROM public.event_categories ec
+JOIN category_duplicates d ON d.dup_id = ec.category_id
+ON CONFLICT DO NOTHING;
+
+DELETE FROM public.event_categories WHERE category_id IN (SELECT dup_id FROM category_duplicates);
+DELETE FROM public.categories WHERE id IN (SELECT dup_id FROM category_duplicates);
+DROP TABLE category_duplicates;
+
+ALTER TABLE public.categories ADD CONSTRAINT categories_name_key UNIQUE (name);
+
+-- 2. Insert an event together with its categories and tags in one transaction / one round trip.
+--    Called by EventExtractor._insert_transaction via supabase.rpc('insert_event_with_links', ...).
+CREATE OR REPLACE FUNCTION public.insert_event_with_links(event jsonb, cat_names text[], tag_names text[])
+RETURNS uuid
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  new_event_id uuid;
+BEGIN
+  INSERT INTO public.events (
+    url, name, start_datetime, end_datetime, school_id, address, location_name,
+    description, is_all_day, type, status, profile_id, post_id, caption_id
+  )
+  SELECT
+    url, name, start_datetime, end_datetime, school_id, address, location_name,
+    description, is_all_day, type, status, profile_id, post_id, caption_id
+  FROM jsonb_populate_record(NULL::public.events, event)
+  RETURNING id INTO new_event_id;
+
+  INSERT INTO public.categories (name)
+  SELECT DISTINCT unnest(cat_names)
+  ON CONFLICT (name) DO NOTHING;
+
+  INSERT INTO public.event_categories (event_id, category_id)
+  SELECT new_event_id, c.id
+  FROM public.categories c
+  WHERE c.name = ANY(cat_names)
+  ON CONFLICT DO NOTHING;
+
+  INSERT INTO public.event_tags (event_id, tag)
+  SELECT DISTINCT new_event_id, t
+  FROM unnest(tag_names) AS t;
+
+  RETURN new_event_id;
+END;
+$$;
+
+-- 3. Insert a whole batch of events: [{"event": {...}, "cat_names": [...], "tag_names": [...]}, ...].
+--    Each event runs in its own subtransaction, so one bad row is skipped instead of failing the batch.
+--    Returns how many events were inserted. Called by EventExtractor.flush_pending_events.
+CREATE OR REPLACE FUNCTION public.insert_events_with_links(events jsonb)
+RETURNS integer
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  item jsonb;
+  inserted integer := 0;
+BEGIN
+  FOR item IN SELECT * FROM jsonb_array_elements(events) LOOP
+    BEGIN
+      PERFORM public.insert_event_with_links(
+        item->'event',
+        ARRAY(SELECT jsonb_array_elements_text(COALESCE(item->'cat_names', '[]'::jsonb))),
+        ARRAY(SELECT jsonb_array_elements_text(COALESCE(item->'tag_names', '[]'::jsonb)))
+      );
+      inserted := inserted + 1;
+    EXCEPTION WHEN OTHERS THEN
+      RAISE WARNING 'insert_events_with_links: skipped event %: %', item->'event'->>'name', SQLERRM;
+    END;
+  END LOOP;
+  RETURN inserted;
+END;
+$$;
+
+-- 4. Unique (event_id, tag) so flush_pending_links can upsert event_tags with ON CONFLICT instead of
+--    retrying row by row on duplicate-key errors. Existing duplicate tags are removed first.
+DELETE FROM public.event_tags a
+USING public.event_tags b
+WHERE a.event_id = b.event_id AND a.tag = b.tag AND a.id > b.id;
+
+ALTER TABLE public.event_tags ADD CONSTRAINT event_tags_event_id_tag_key UNIQUE (event_id, tag);
+
+-- 5. Caption-only posts that Groq found no events in, keyed by EventExtractor._no_event_key (sha1 of the
+--    normalized caption and bio and the post date). Posts whose hash is here skip the Groq call.
+CREATE TABLE public.no_event_captions (
+  hash text NOT NULL,
+  created_at timestamp with time zone DEFAULT now(),
+  CONSTRAINT no_event_captions_pkey PRIMARY KEY (hash)
+);
+
+-- 6. Expire no_event_captions rows older than EventExtractor's processing cutoff (POST_MAX_AGE_DAYS): their keys
+--    include a post date that is retired by then, so they can never match again. flush_no_event_captions calls
+--    prune_no_event_captions after each batch; load_no_event_captions reads only rows since the cutoff.
+CREATE INDEX no_event_captions_created_at_idx ON public.no_event_captions (created_at);
+
+CREATE OR REPLACE FUNCTION public.prune_no_event_captions(cutoff timestamptz)
+RETURNS integer
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  pruned integer;
+BEGIN
+  DELETE FROM public.no_event_captions WHERE created_at < cutoff;
+  GET DIAGNOSTICS pruned = ROW_COUNT;
+  RETURN pruned;
+END;
+$$;
@@ -1,15 +1,25 @@
 #!/usr/bin/env python3
 
+import asyncio
 import os
 import re
 import time
-from typing import Optional, Set
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, List, Optional, Set
 from urllib.parse import urlparse
 
+import urllib3
 from dotenv import load_dotenv
-from playwright.sync_api import sync_playwright, Page, BrowserContext
+from playwright.async_api import async_playwright, Page, Response, Route, TimeoutError as PlaywrightTimeoutError
 from supabase import create_client, Client
 
+from save_instagram_cookies import session_is_valid
+
+
+# Instagram usernames, bare and as a root-relative profile link ("/username/")
+_USERNAME_RE = re.compile(r"[A-Za-z0-9._]+")
+_HREF_RE = re.compile(r"/[A-Za-z0-9._]+/?")
+
 
 def get_env_var(name: str) -> str:
     val = os.getenv(name)
@@ -26,191 +36,392 @@ def get_username_from_url(url: str) -> Optional[str]:
             return None
         username = path.split('/')[0]
         # Basic Instagram username sanity check
-        return username if re.fullmatch(r"[A-Za-z0-9._]+", username) else None
+        return username if _USERNAME_RE.fullmatch(username) else None
     except Exception:
         return None
 
 
-def locate_bio_text(page: Page) -> Optional[str]:
+# Candidate selectors, most specific first (Instagram's class names are best-effort)
+BIO_SELECTORS = [
+    'span._ap3a._aaco._aacu._aacx._aad7._aade',
+    # Fallback: first span in the bio area heuristically
+    'section main span[dir="auto"]',
+]
+DISPLAY_NAME_SELECTORS = [
+    'span.x1lliihq.x1plvlek.xryxfnj.x1n2onr6.xyejjpt.x15dsfln.x193iq5w.xeuugli.x1fj9vlw.x13faqbe.x1vvkbs.x1s928wv.xhkezso.x1gmr53x.x1cpjm7i.x1fgarty.x1943h6x.x1i0vuye.xvs91rp.x1s688f.x5n08af.x10wh9bi.xpm28yp.x8viiok.x1o7cslx',
+    'header h1',
+    'section main h1',
+    'section main span[dir="auto"]:nth-of-type(1)',
+]
+
+# Reads bio, display name and profile picture URL in one round trip to the page instead of a
+# count()/inner_text()/get_attribute() call per selector
+PROFILE_SNAPSHOT_JS = """
+([bioSelectors, nameSelectors]) => {
+    const firstText = (selectors) => {
+        for (const sel of selectors) {
+            const el = document.querySelector(sel);
+            const txt = el && el.innerText.trim();
+            if (txt) return txt;
+        }
+        return null;
+    };
+    // Instagram titles profiles "Name (@username) • Instagram photos and videos" (og:title carries the same);
+    // the name selectors are only a fallback for when neither has one
+    const titleOf = (text) => {
+        const m = /^(.*?) \(@/.exec(text || '');
+        return m && m[1].trim() ? m[1].trim() : null;
+    };
+    const ogTitle = document.querySelector('meta[property="og:title"]')?.getAttribute('content');
+    // Prefer the profile picture in the header, else any image with alt ending in "profile picture"
+    const headerSrc = document.querySelector('header img')?.getAttribute('src');
+    const altSrc = document.querySelector('img[alt$="profile picture"]')?.getAttribute('src');
+    return {
+        bio: firstText(bioSelectors),
+        name: titleOf(document.title) || titleOf(ogTitle) || firstText(nameSelectors),
+        pfp: (headerSrc && headerSrc.includes('cdninstagram.com') ? headerSrc : altSrc) || null,
+    };
+}
+"""
+
+
+# Profile links in the followers dialog, in document order, normalised to "/username/". The page filters
+# them against _HREF_RE's pattern (passed in) so only profile links are serialised back
+FOLLOWER_HREFS_JS = """
+(dialog, hrefPattern) => {
+    const profileHref = new RegExp('^(?:' + hrefPattern + ')$');
+    return Array.from(
+        dialog.querySelectorAll('a[href^="/"][role="link"], a[href^="/"], a[href*="/"][role="link"]'),
+        a => a.getAttribute('href')
+    ).filter(href => href && profileHref.test(href)).map(href => href.replace(/\\/?$/, '/'));
+}
+"""
+
+
+def is_followers_response(url: str) -> bool:
+    # The followers dialog pages through /api/v1/friendships/<id>/followers/ as it scrolls (or, on
+    # some builds, a graphql/query whose payload followers_from_payload recognises)
+    return ('/friendships/' in url and '/followers/' in url) or '/graphql/query' in url
+
+
+def followers_from_payload(payload: Any) -> Dict[str, Dict[str, Optional[str]]]:
+    # {username: {'name', 'pfp'}} from a followers API response (REST "users" list or GraphQL edges)
+    if not isinstance(payload, dict):
+        return {}
+    users = payload.get('users')
+    if users is None:
+        edges = (((payload.get('data') or {}).get('user') or {}).get('edge_followed_by') or {}).get('edges') or []
+        users = [edge.get('node') or {} for edge in edges]
+    followers = {}
+    for user in users:
+        username = user.get('username') or ''
+        if _USERNAME_RE.fullmatch(username):
+            followers[username] = {
+                'name': user.get('full_name') or None,
+                'pfp': user.get('profile_pic_url') or None,
+            }
+    return followers
+
+
+async def expand_bio(page: Page) -> None:
     # Try to expand bio if a 'more' button exists near the bio
     try:
         more_btn = page.locator('span._ap3a:has-text("more")').first
-        if more_btn.count():
-            more_btn.click(timeout=1500)
-            time.sleep(0.3)
+        if await more_btn.count():
+            await more_btn.click(timeout=1500)
+            await asyncio.sleep(0.3)
     except Exception:
         pass
 
-    # Primary selector (class-based; best-effort)
-    try:
-        span = page.locator('span._ap3a._aaco._aacu._aacx._aad7._aade').first
-        if span.count():
-            txt = span.inner_text(timeout=1500).strip()
-            if txt:
-                return txt
-    except Exception:
-        pass
 
-    # Fallback: grab first visible span in the bio area heuristically
+async def read_profile(page: Page) -> Dict[str, Optional[str]]:
+    # {'bio', 'name', 'pfp'} for the open profile page; missing values are None
+    await expand_bio(page)
     try:
-        bio = page.locator('section main span[dir="auto"]').first
-        if bio.count():
-            txt = bio.inner_text(timeout=1500).strip()
-            if txt:
-                return txt
+        return await page.evaluate(PROFILE_SNAPSHOT_JS, [BIO_SELECTORS, DISPLAY_NAME_SELECTORS])
     except Exception:
-        pass
-    return None
+        return {'bio': None, 'name': None, 'pfp': None}
+
+
+# Resource types profile pages never need: we only read the DOM, and the profile picture src is in the
+# markup whether or not the image loads (it is downloaded separately through _http)
+PROFILE_BLOCKED_RESOURCES = frozenset({'image', 'media', 'font', 'stylesheet'})
+# The followers page keeps its stylesheets so the dialog still lays out and scrolls
+FOLLOWERS_BLOCKED_RESOURCES = frozenset({'image', 'media', 'font'})
+
+
+def resource_blocker(blocked: FrozenSet[str]) -> Callable[[Route], Awaitable[None]]:
+    # Route handler aborting requests whose resource type is in blocked
+    async def handle(route: Route) -> None:
+        if route.request.resource_type in blocked:
+            await route.abort()
+        else:
+            await route.continue_()
+    return handle
+
+
+# Pooled keep-alive connections for profile picture downloads; they all come from the same CDN hosts
+_http = urllib3.PoolManager(num_pools=4, maxsize=16, retries=urllib3.Retry(3, backoff_factor=0.3))
+
+
+def download_image(url: str) -> Optional[bytes]:
+    # Blocking GET over the shared pool (call it via asyncio.to_thread); None unless the CDN answers 200
+    resp = _http.request('GET', url, timeout=10.0)
+    return resp.data if resp.status == 200 else None
 
 
-def locate_display_name(page: Page) -> Optional[str]:
-    # Try common spots for the profile display name
-    for sel in [
-        'span.x1lliihq.x1plvlek.xryxfnj.x1n2onr6.xyejjpt.x15dsfln.x193iq5w.xeuugli.x1fj9vlw.x13faqbe.x1vvkbs.x1s928wv.xhkezso.x1gmr53x.x1cpjm7i.x1fgarty.x1943h6x.x1i0vuye.xvs91rp.x1s688f.x5n08af.x10wh9bi.xpm28yp.x8viiok.x1o7cslx',
-        'header h1',
-        'section main h1',
-        'section main span[dir="auto"]:nth-of-type(1)'
-    ]:
+# Student rows per bulk upsert request
+STUDENT_FLUSH_SIZE = 500
+# Rows per page when reading students back (PostgREST's default max-rows)
+STUDENT_PAGE_SIZE = 1000
+
+
+def fetch_processed_usernames(supabase: Client) -> Set[str]:
+    # Every username already saved as processed, so a re-run doesn't revisit those profiles
+    usernames: Set[str] = set()
+    start = 0
+    while True:
+        rows = supabase.table('students').select('username').eq('processed', True).order('username').range(
+            start, start + STUDENT_PAGE_SIZE - 1
+        ).execute().data or []
+        usernames.update(row['username'] for row in rows)
+        if len(rows) < STUDENT_PAGE_SIZE:
+            return usernames
+        start += STUDENT_PAGE_SIZE
+
+
+def save_student_row(supabase: Client, row: Dict[str, Any]) -> None:
+    # Single-row save with insert/update fallbacks; used when a batch upsert fails
+    try:
+        supabase.table('students').upsert(row, on_conflict='username').execute()
+    except Exception:
+        # Fallback: insert or update
         try:
-            el = page.locator(sel).first
-            if el.count():
-                txt = el.inner_text(timeout=1500).strip()
-                if txt:
-                    return txt
+            supabase.table('students').insert(row).execute()
         except Exception:
-            continue
-    return None
+            try:
+                supabase.table('students').update({
+                    'name': row['name'],
+                    'profile_pic_url': row['profile_pic_url'],
+                    'processed': True,
+                }).eq('username', row['username']).execute()
+            except Exception:
+                pass
 
 
-def locate_profile_pic_url(page: Page) -> Optional[str]:
-    # Prefer the profile picture in the header
+def flush_students(supabase: Client, rows: List[Dict[str, Any]]) -> None:
+    # Upsert all queued rows in one request (one per username - a repeat would fail the whole batch), then clear them
+    if not rows:
+        return
+    # Wait for any profile picture uploads still running on the storage pool
+    for row in rows:
+        if isinstance(row['profile_pic_url'], Future):
+            row['profile_pic_url'] = row['profile_pic_url'].result()
+    unique_rows = list({row['username']: row for row in rows}.values())
     try:
-        img = page.locator('header img').first
-        if img.count():
-            src = img.get_attribute('src')
-            if src and 'cdninstagram.com' in src:
-                return src
-    except Exception:
-        pass
-    # Fallback: any large image with alt ending in "profile picture"
+        supabase.table('students').upsert(unique_rows, on_conflict='username').execute()
+    except Exception as e:
+        print(f"Batch upsert of {len(unique_rows)} students failed, saving one by one: {e}")
+        for row in unique_rows:
+            save_student_row(supabase, row)
+    rows.clear()
+
+
+# Storage bucket the profile pictures go to
+PFP_BUCKET = 'instagram-pfp'
+
+
+# Files per page when listing the bucket
+PFP_LIST_PAGE_SIZE = 1000
+
+
+def pfp_filename(username: str) -> str:
+    return f"{username}.jpg"
+
+
+def fetch_existing_pfps(bucket: Any) -> Set[str]:
+    # Names of every file already in the bucket, so stored pictures are neither downloaded nor uploaded again
+    names: Set[str] = set()
+    offset = 0
+    while True:
+        files = bucket.list('', {'limit': PFP_LIST_PAGE_SIZE, 'offset': offset}) or []
+        names.update(f['name'] for f in files)
+        if len(files) < PFP_LIST_PAGE_SIZE:
+            return names
+        offset += PFP_LIST_PAGE_SIZE
+
+
+def upload_pfp(bucket: Any, username: str, img_bytes: bytes, existing_pfps: Set[str]) -> Optional[str]:
+    # Store a profile picture in bucket (a supabase.storage.from_ handle) and return its public URL
+    # (None if both upload and update fail); the file is added to existing_pfps once stored
+    filename = pfp_filename(username)
+    # Try upload; ignore if already exists
     try:
-        img = page.locator('img[alt$="profile picture"]').first
-        if img.count():
-            src = img.get_attribute('src')
-            if src:
-                return src
+        bucket.upload(
+            filename,
+            img_bytes,
+            file_options={"content-type": "image/jpeg"}
+        )
+        existing_pfps.add(filename)
+        # Generate public URL for the uploaded file
+        return bucket.get_public_url(filename)
     except Exception:
-        pass
-    return None
+        # If file exists, attempt overwrite via update()
+        try:
+            bucket.update(
+                filename,
+                img_bytes,
+                file_options={"content-type": "image/jpeg"}
+            )
+            existing_pfps.add(filename)
+            # Generate public URL for the updated file
+            return bucket.get_public_url(filename)
+        except Exception:
+            return None
+
+
+class TokenBucket:
+    # Paces profile navigations: bursts of up to capacity, then rate per second. backoff() halves the rate
+    # when Instagram pushes back, and each success() adds a little back until it's at the base rate again (AIMD)
+
+    def __init__(self, rate: float, capacity: int, min_rate: float = 0.25, recovery: float = 0.1) -> None:
+        self.base_rate = rate
+        self.rate = rate
+        self.capacity = capacity
+        self.min_rate = min_rate
+        self.recovery = recovery
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> None:
+        while True:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def backoff(self) -> None:
+        self._refill()
+        self.rate = max(self.min_rate, self.rate / 2)
+        print(f"Instagram is pushing back, slowing to {self.rate:.2f} profiles/s")
+
+    def success(self) -> None:
+        self._refill()
+        self.rate = min(self.base_rate, self.rate + self.recovery)
+
 
+# Instagram sends throttled sessions here instead of to the profile
+BLOCKED_URL_MARKERS = ('/accounts/login', '/challenge/')
 
-def process_profile(context: BrowserContext, supabase: Client, profile_href: str) -> None:
+
+async def process_profile(page: Page, bucket: Any, profile_href: str,
+                          storage_pool: ThreadPoolExecutor, existing_pfps: Set[str],
+                          throttle: TokenBucket,
+                          known: Optional[Dict[str, Optional[str]]] = None) -> Optional[Dict[str, Any]]:
+    # Scrape one follower's profile and return its students row (None if the page couldn't be read);
+    # the caller batches the rows into flush_students. profile_pic_url may be a Future from storage_pool.
+    # known holds the name/pfp the followers API already gave us, if any. page is a pooled tab the caller owns
     base = 'https://www.instagram.com'
     url = base + profile_href if profile_href.startswith('/') else profile_href
 
-    page = None
     try:
-        page = context.new_page()
-        page.goto(url, timeout=30000)  # Reduced timeout
-        page.wait_for_load_state('domcontentloaded')
+        await throttle.acquire()
+        # Return as soon as the response starts arriving; only the header/bio nodes are needed, not a full DOM parse
+        response = await page.goto(url, wait_until='commit', timeout=10000)
+    except PlaywrightTimeoutError:
+        print(f"Timed out navigating to {url}")
+        throttle.backoff()
+        return None
     except Exception as e:
         print(f"Error navigating to {url}: {e}")
-        if page:
-            page.close()
-        return
+        throttle.backoff()
+        return None
+
+    if (response and response.status == 429) or any(marker in page.url for marker in BLOCKED_URL_MARKERS):
+        # Rate limited or bounced to login/challenge; leave the follower unprocessed for a later run
+        print(f"Blocked opening {url} (landed on {page.url})")
+        throttle.backoff()
+        return None
+    throttle.success()
+
+    try:
+        await page.wait_for_selector('header', timeout=5000)
+    except Exception:
+        # Header never rendered (slow page); an empty bio here would mark the follower processed forever,
+        # so leave it unprocessed for a later run instead
+        print(f"Profile header didn't render for {url}")
+        return None
 
     try:
         username = get_username_from_url(page.url) or ''
         if not username:
-            return
+            return None
+
+        snapshot = await read_profile(page)
+        if not snapshot['bio'] and not snapshot['name']:
+            # Header is there but nothing readable in it yet; same as above, retry on a later run
+            print(f"Nothing readable on {url} yet")
+            return None
 
         # Bio gate: must include 'phhs' (case-insensitive) or skip forever
-        bio = locate_bio_text(page) or ''
+        bio = snapshot['bio'] or ''
         if 'phhs' not in bio.lower():
-            try:
-                supabase.table('students').upsert({
-                    'username': username,
-                    'name': None,
-                    'profile_pic_url': None,
-                    'processed': True,
-                }, on_conflict='username').execute()
-            except Exception:
-                pass
-            return
+            return {
+                'username': username,
+                'name': None,
+                'profile_pic_url': None,
+                'processed': True,
+            }
 
-        # Capture display name (optional)
-        display_name = locate_display_name(page)
+        # Capture display name (optional); the followers API's full_name is more reliable than the page selectors
+        known = known or {}
+        display_name = known.get('name') or snapshot['name']
 
-        # Capture profile picture and save to storage
-        pfp_url = locate_profile_pic_url(page)
+        # Capture profile picture and save to storage (the page's is larger than the API's thumbnail)
+        pfp_url = snapshot['pfp'] or known.get('pfp')
         stored_pfp_url = None
-        if pfp_url:
+        if pfp_filename(username) in existing_pfps:
+            # Already stored on an earlier run; get_public_url only formats the URL, no request
+            stored_pfp_url = bucket.get_public_url(pfp_filename(username))
+        elif pfp_url:
             try:
-                resp = context.request.get(pfp_url)
-                if resp.ok:
-                    img_bytes = resp.body()
-                    filename = f"{username}.jpg"
-                    # Try upload; ignore if already exists
-                    try:
-                        supabase.storage.from_('instagram-pfp').upload(
-                            filename,
-                            img_bytes,
-                            file_options={"content-type": "image/jpeg"}
-                        )
-                        # Generate public URL for the uploaded file
-                        stored_pfp_url = supabase.storage.from_('instagram-pfp').get_public_url(filename)
-                    except Exception:
-                        # If file exists, attempt overwrite via update()
-                        try:
-                            supabase.storage.from_('instagram-pfp').update(
-                                filename,
-                                img_bytes,
-                                file_options={"content-type": "image/jpeg"}
-                            )
-                            # Generate public URL for the updated file
-                            stored_pfp_url = supabase.storage.from_('instagram-pfp').get_public_url(filename)
-                        except Exception:
-                            pass
+                img_bytes = await asyncio.to_thread(download_image, pfp_url)
+                if img_bytes:
+                    # Upload in the background; flush_students waits for the public URL
+                    stored_pfp_url = storage_pool.submit(upload_pfp, bucket, username, img_bytes, existing_pfps)
             except Exception as e:
                 print(f"Error processing profile picture for {username}: {e}")
 
-        # Save to students (processed = true)
-        try:
-            supabase.table('students').upsert({
-                'username': username,
-                'name': display_name,
-                'profile_pic_url': stored_pfp_url,
-                'processed': True,
-            }, on_conflict='username').execute()
-        except Exception:
-            # Fallback: insert or update
-            try:
-                supabase.table('students').insert({
-                    'username': username,
-                    'name': display_name,
-                    'profile_pic_url': stored_pfp_url,
-                    'processed': True,
-                }).execute()
-            except Exception:
-                try:
-                    supabase.table('students').update({
-                        'name': display_name,
-                        'profile_pic_url': stored_pfp_url,
-                        'processed': True,
-                    }).eq('username', username).execute()
-                except Exception:
-                    pass
+        # Saved to students (processed = true) by the caller's next flush
+        return {
+            'username': username,
+            'name': display_name,
+            'profile_pic_url': stored_pfp_url,
+            'processed': True,
+        }
     except Exception as e:
         print(f"Error processing profile {profile_href}: {e}")
-    finally:
-        if page:
-            try:
-                page.close()
-            except Exception:
-                pass
+        return None
+
+
+# Profiles scraped at once, each in its own long-lived page of the shared (logged-in) browser context
+PROFILE_CONCURRENCY = int(os.getenv('PROFILE_CONCURRENCY', '8'))
+# Profile navigations per second, and how many may start back to back, before any backoff
+PROFILE_RATE = float(os.getenv('PROFILE_RATE', '4'))
+PROFILE_BURST = 8
 
 
 def main() -> None:
+    asyncio.run(crawl_followers())
+
+
+async def crawl_followers() -> None:
     load_dotenv()
 
     # Supabase (no hardcoding)
@@ -221,6 +432,8 @@ def main() -> None:
     COOKIES = os.path.join(os.path.dirname(__file__), 'files', 'instagram_cookies.json')
     if not os.path.exists(COOKIES):
         raise FileNotFoundError(f"Cookies file not found: {COOKIES}")
+    if not session_is_valid(COOKIES):
+        raise RuntimeError(f"Instagram session in {COOKIES} has expired; run save_instagram_cookies.py to log in again")
 
     headless_env = os.getenv('HEADLESS', 'true').lower()
     headless = False if headless_env in ('0', 'false', 'no') else True
@@ -230,11 +443,11 @@ def main() -> None:
     except ValueError:
         batch_target = 4200
 
-    with sync_playwright() as p:
+    async with async_playwright() as p:
         print(f"Launching browser (headless={headless})…")
         
         # Launch with anti-detection settings
-        browser = p.chromium.launch(
+        browser = await p.chromium.launch(
             headless=headless,
             args=[
                 '--no-first-run',
@@ -245,23 +458,43 @@ def main() -> None:
         )
         
         # Create context with realistic settings
-        context = browser.new_context(
+        context = await browser.new_context(
             storage_state=COOKIES,
             viewport={'width': 1280, 'height': 720},
             user_agent='Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
         )
-        page = context.new_page()
+        await context.route('**/*', resource_blocker(PROFILE_BLOCKED_RESOURCES))
+        page = await context.new_page()
+        # Page routes take precedence over the context's, so this one keeps its CSS
+        await page.route('**/*', resource_blocker(FOLLOWERS_BLOCKED_RESOURCES))
+
+        # Followers (with name and picture) straight from the API responses the dialog loads as it scrolls
+        api_followers: Dict[str, Dict[str, Optional[str]]] = {}
+        # Usernames captured since the last scroll was processed
+        api_new: List[str] = []
+
+        async def capture_followers(response: Response) -> None:
+            if response.status != 200 or not is_followers_response(response.url):
+                return
+            try:
+                followers = followers_from_payload(await response.json())
+            except Exception:
+                return
+            api_new.extend(username for username in followers if username not in api_followers)
+            api_followers.update(followers)
+
+        page.on('response', capture_followers)
 
         # Open Instagram
         print("Opening Instagram…")
-        page.goto('https://www.instagram.com/', timeout=60000)
-        page.wait_for_load_state('domcontentloaded')
+        await page.goto('https://www.instagram.com/', timeout=60000)
+        await page.wait_for_load_state('domcontentloaded')
 
         # Try direct navigation first (more reliable)
         print("Navigating directly to pathenryasb profile…")
         try:
-            page.goto('https://www.instagram.com/pathenryasb/', timeout=30000)
-            page.wait_for_load_state('domcontentloaded')
+            await page.goto('https://www.instagram.com/pathenryasb/', timeout=30000)
+            await page.wait_for_load_state('domcontentloaded')
             print("✅ Direct navigation successful")
         except Exception as e:
             print(f"❌ Direct navigation failed: {e}")
@@ -269,10 +502,10 @@ def main() -> None:
             
             try:
                 # Search method fallback
-                page.locator('svg[aria-label="Search"]').first.click(timeout=10000)
+                await page.locator('svg[aria-label="Search"]').first.click(timeout=10000)
                 search_input = page.locator('input[aria-label="Search input"]').first
-                search_input.fill('pathenryasb')
-                time.sleep(2.0)  # Longer wait for search results
+                await search_input.fill('pathenryasb')
+                await asyncio.sleep(2.0)  # Longer wait for search results
                 
                 # Try multiple result selectors
                 clicked = False
@@ -283,8 +516,8 @@ def main() -> None:
                 ]:
                     try:
                         element = page.locator(selector).first
-                        if element.count():
-                            element.click(timeout=5000)
+                        if await element.count():
+                            await element.click(timeout=5000)
                             clicked = True
                             break
                     except Exception:
@@ -292,15 +525,15 @@ def main() -> None:
                 
                 if not clicked:
                     print("❌ Could not find pathenryasb in search results")
-                    browser.close()
+                    await browser.close()
                     return
                     
             except Exception as search_error:
                 print(f"❌ Search method also failed: {search_error}")
-                browser.close()
+                await browser.close()
                 return
 
-        page.wait_for_load_state('domcontentloaded')
+        await page.wait_for_load_state('domcontentloaded')
 
         # Open followers list
         print("Opening followers…")
@@ -322,9 +555,9 @@ def main() -> None:
             for selector in selectors:
                 try:
                     element = page.locator(selector).first
-                    if element.count():
+                    if await element.count():
                         print(f"✅ Found followers element with selector: {selector}")
-                        element.click(timeout=5000)
+                        await element.click(timeout=5000)
                         followers_clicked = True
                         break
                 except Exception as e:
@@ -333,22 +566,59 @@ def main() -> None:
             
             if not followers_clicked:
                 print("❌ Could not find followers link with any selector")
-                browser.close()
+                await browser.close()
                 return
         except Exception as e:
             print(f"❌ Error opening followers: {e}")
-            browser.close()
+            await browser.close()
             return
 
         # Process followers: collect batch, scroll, repeat (simple strategy)
         processed: Set[str] = set()
+        # Profiles finished on earlier runs are skipped without a page load
+        try:
+            already_processed = fetch_processed_usernames(supabase)
+        except Exception as e:
+            print(f"Could not load already-processed students, every follower will be visited: {e}")
+            already_processed = set()
+        print(f"Skipping {len(already_processed)} followers processed on earlier runs")
+        pending_rows: List[Dict[str, Any]] = []
+        # The flush in progress: it waits on pfp uploads (Future.result) in a worker thread while scraping continues
+        flush_task: Optional[asyncio.Task] = None
+        # Pages are reused from profile to profile instead of opening a new tab each time
+        page_pool: asyncio.Queue = asyncio.Queue()
+        for _ in range(PROFILE_CONCURRENCY):
+            page_pool.put_nowait(await context.new_page())
+        throttle = TokenBucket(PROFILE_RATE, PROFILE_BURST)
+        # Profile picture uploads run here so scraping doesn't wait on Storage
+        storage_pool = ThreadPoolExecutor(max_workers=8)
+        # One bucket handle (supabase.storage.from_) shared by every upload
+        bucket = supabase.storage.from_(PFP_BUCKET)
+        try:
+            existing_pfps = fetch_existing_pfps(bucket)
+        except Exception as e:
+            print(f"Could not list stored profile pictures, every picture will be uploaded: {e}")
+            existing_pfps = set()
+
+        async def scrape_bounded(href: str) -> Optional[Dict[str, Any]]:
+            profile_page = await page_pool.get()
+            try:
+                known = api_followers.get(href.strip('/'))
+                return await process_profile(profile_page, bucket, href, storage_pool, existing_pfps, throttle, known)
+            finally:
+                if profile_page.is_closed():
+                    # Crashed or closed by the site; replace it so the pool keeps its size
+                    profile_page = await context.new_page()
+                page_pool.put_nowait(profile_page)
         print(f"Processing up to {batch_target} followers…")
 
         # Wait for followers dialog to appear
-        time.sleep(2.0)
+        await asyncio.sleep(2.0)
         
         no_new_followers_count = 0
         max_no_new_followers = 5  # Stop if no new followers found for 5 iterations
+        # Every profile link seen in the dialog so far; each scroll only looks at links it hasn't seen yet
+        dialog_seen: Set[str] = set()
         
         while len(processed) < batch_target and no_new_followers_count < max_no_new_followers:
             # Try different selectors for the dialog
@@ -360,7 +630,7 @@ def main() -> None:
             ]:
                 try:
                     dialog_candidate = page.locator(dialog_selector).first
-                    if dialog_candidate.count():
+                    if await dialog_candidate.count():
                         dialog = dialog_candidate
                         break
                 except Exception:
@@ -370,31 +640,21 @@ def main() -> None:
                 print("❌ Could not find followers dialog")
                 break
 
-            # Grab visible follower profile links with multiple selectors
-            hrefs = []
-            for link_selector in [
-                'a[href^="/"][role="link"]',
-                'a[href^="/"]',
-                'a[href*="/"][role="link"]'
-            ]:
-                try:
-                    links = dialog.locator(link_selector).all()
-                    for a in links:
-                        try:
-                            href = a.get_attribute('href') or ''
-                            # Match Instagram username patterns
-                            if re.fullmatch(r"/[A-Za-z0-9._]+/?", href or ''):
-                                hrefs.append(href.rstrip('/') + '/')
-                        except Exception:
-                            continue
-                except Exception:
-                    continue
-
-            # Deduplicate while preserving order
-            seen = set()
-            unique_hrefs = [h for h in hrefs if not (h in seen or seen.add(h))]
+            # Grab visible follower profile links, all in one round trip to the page
+            try:
+                # Already matched against Instagram username patterns
+                hrefs = await dialog.evaluate(FOLLOWER_HREFS_JS, _HREF_RE.pattern)
+            except Exception:
+                hrefs = []
+            # Plus followers the API returned that haven't rendered as links yet
+            hrefs.extend(f"/{username}/" for username in api_new)
+            api_new.clear()
+
+            # Links not seen on earlier scrolls, deduplicated while preserving order
+            unique_hrefs = list(dict.fromkeys(h for h in hrefs if h not in dialog_seen))
+            dialog_seen.update(unique_hrefs)
             
-            print(f"Found {len(unique_hrefs)} profile links in this batch")
+            print(f"Found {len(unique_hrefs)} new profile links in this batch")
             
             if not unique_hrefs:
                 no_new_followers_count += 1
@@ -402,38 +662,57 @@ def main() -> None:
             else:
                 no_new_followers_count = 0
 
-            # Process new ones
-            new_in_batch = 0
+            # Pick the new ones (up to the batch target)
+            new_hrefs = []
             for href in unique_hrefs:
+                if len(processed) >= batch_target:
+                    break
                 uname = href.strip('/').split('/')[0]
-                if uname in processed:
+                if uname in processed or uname in already_processed:
                     continue
                 processed.add(uname)
-                new_in_batch += 1
+                new_hrefs.append(href)
                 print(f"- {len(processed)}: {uname}")
-                process_profile(context, supabase, href)
-                # Small delay to prevent overwhelming the system
-                time.sleep(0.5)
-                if len(processed) >= batch_target:
-                    break
+            new_in_batch = len(new_hrefs)
+
+            # Scrape them concurrently, PROFILE_CONCURRENCY pages at a time
+            for row in await asyncio.gather(*(scrape_bounded(href) for href in new_hrefs)):
+                if row:
+                    pending_rows.append(row)
+            if len(pending_rows) >= STUDENT_FLUSH_SIZE:
+                # One flush at a time, so rows for the same username land in order
+                if flush_task:
+                    await flush_task
+                rows, pending_rows = pending_rows, []
+                flush_task = asyncio.create_task(asyncio.to_thread(flush_students, supabase, rows))
             
             print(f"Processed {new_in_batch} new profiles in this batch")
 
             # Scroll the followers dialog to load more
             try:
                 if dialog:
-                    dialog.hover()
-                    page.mouse.wheel(0, 3000)
-                    time.sleep(2.0)  # Longer wait for content to load
+                    await dialog.hover()
+                    await page.mouse.wheel(0, 3000)
+                    await asyncio.sleep(2.0)  # Longer wait for content to load
                 else:
-                    page.mouse.wheel(0, 3000)
-                    time.sleep(2.0)
+                    await page.mouse.wheel(0, 3000)
+                    await asyncio.sleep(2.0)
             except Exception as e:
                 print(f"Error scrolling: {e}")
                 break
 
+        # Save whatever is left from the last partial batch
+        if flush_task:
+            await flush_task
+        await asyncio.to_thread(flush_students, supabase, pending_rows)
+        storage_pool.shutdown()
         print(f"Done. Processed {len(processed)} followers.")
-        browser.close()
+        # Write back the session as Instagram refreshed it, so the next run starts from the newest cookies
+        try:
+            await context.storage_state(path=COOKIES)
+        except Exception as e:
+            print(f"Could not save refreshed session cookies: {e}")
+        await browser.close()
 
 
 if __name__ == '__main__':
@@ -1,16 +1,37 @@
 from pathlib import Path
 import json
-from playwright.sync_api import sync_playwright
+import sys
+import time
+from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
 
 OUTPUT_FILE = Path(__file__).resolve().parent / "files" / "instagram_cookies.json"
 LOGIN_URL = "https://www.instagram.com/accounts/login/"
-TIMEOUT_MS = 60_000  # 60 seconds to log in manually
+TIMEOUT_MS = 300_000  # up to 5 minutes to log in manually
+
+
+def session_is_valid(path: Path) -> bool:
+    """Return True if the saved storage state has a sessionid cookie that hasn't expired."""
+    try:
+        with Path(path).open("r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return False
+    for cookie in state.get("cookies", []):
+        if cookie.get("name") == "sessionid":
+            # -1 marks a browser-session cookie with no expiry date
+            expires = cookie.get("expires", -1)
+            return expires == -1 or expires > time.time()
+    return False
 
 
 def main() -> None:
     """Launch a browser for manual Instagram login and save session cookies."""
     OUTPUT_FILE.parent.mkdir(parents=True, exist_ok=True)
 
+    if "--force" not in sys.argv and session_is_valid(OUTPUT_FILE):
+        print("Saved Instagram session is still valid; nothing to do (pass --force to log in again).")
+        return
+
     with sync_playwright() as p:
         browser = p.chromium.launch(headless=False)
         context = browser.new_context()
@@ -19,12 +40,15 @@ def main() -> None:
         print("Opening Instagram login page…")
         page.goto(LOGIN_URL)
         print(
-            "Please complete the login within 60 seconds. "
+            "Please complete the login within 5 minutes. "
             "The window will close automatically when done."
         )
 
-        # Wait for the user to finish logging in.
-        page.wait_for_timeout(TIMEOUT_MS)
+        # Wait for the user to finish logging in (Instagram navigates away from the login pages).
+        try:
+            page.wait_for_url(lambda url: "/accounts/login" not in url, timeout=TIMEOUT_MS)
+        except PlaywrightTimeoutError:
+            print("Timed out waiting for login to complete.")
 
         # Save storage state (cookies + localStorage, etc.)
         state = context.storage_state()
@@ -10,6 +10,10 @@ load_dotenv()
 
 STATE = "instagram/files/instagram_cookies.json"
 SCHOOL_ID = "00000000-0000-0000-0000-000000000001"  # Patrick Henry High School
+# Profiles scraped at once, each worker in its own browser context
+CONCURRENCY = int(os.getenv("SCRAPE_CONCURRENCY", "6"))
+# Post image downloads+uploads in flight at once, across all workers
+image_transfers = asyncio.Semaphore(8)
 
 # Supabase setup
 supabase_url = os.getenv("SUPABASE_PROJECT_URL")
@@ -37,18 +41,14 @@ def is_post_recent_enough(post_date, months_threshold=3):
     
     return post_date_only >= cutoff_date
 
-async def file_exists_in_storage(filepath, bucket_name):
-    """Check if file already exists in Supabase storage"""
+async def list_storage_folder(bucket_name, folder):
+    """Return the set of file names in a Supabase storage folder"""
     try:
-        result = supabase.storage.from_(bucket_name).list(path=os.path.dirname(filepath))
-        if result:
-            filename = os.path.basename(filepath)
-            existing_files = [file['name'] for file in result]
-            return filename in existing_files
-        return False
+        result = await asyncio.to_thread(supabase.storage.from_(bucket_name).list, folder)
+        return {file['name'] for file in result or []}
     except Exception as e:
-        print(f"❌ Error checking file existence: {e}")
-        return False
+        print(f"❌ Error listing {bucket_name}/{folder}: {e}")
+        return set()
 
 async def extract_post_date(dialog):
     """Extract post date from Instagram time element"""
@@ -80,6 +80,31 @@ async def extract_post_date(dialog):
         print(f"❌ Error extracting post date: {e}")
         return None
 
+# Profile header selectors (Instagram's class names; best-effort)
+BIO_SELECTOR = 'span._ap3a._aaco._aacu._aacx._aad7._aade'
+LINK_SELECTOR = 'div._ap3a._aaco._aacw._aacz._aada._aade'
+MORE_BUTTON_SELECTOR = 'span.x1lliihq.x1plvlek.xryxfnj.x1n2onr6.x1ji0vk5.x18bv5gf.x193iq5w.xeuugli.x1fj9vlw.x13faqbe.x1vvkbs.x1s928wv.xhkezso.x1gmr53x.x1cpjm7i.x1fgarty.x1943h6x.x1i0vuye.xvs91rp.xo1l8bm.x1roi4f4.x1yc453h.x10wh9bi.xpm28yp.x8viiok.x1o7cslx'
+
+PROFILE_INFO_JS = """
+([bioSelector, linkSelector, moreSelector]) => {
+    const text = (sel) => {
+        const el = document.querySelector(sel);
+        const txt = el && el.innerText.trim();
+        return txt || null;
+    };
+    return {
+        pic_url: document.querySelector('header img')?.getAttribute('src') || null,
+        bio_text: text(bioSelector),
+        link_text: text(linkSelector),
+        has_more: Array.from(document.querySelectorAll(moreSelector)).some(el => el.textContent.includes('more')),
+    };
+}
+"""
+
+async def read_profile_info(page):
+    """Read profile picture URL, bio, link and whether the bio is truncated in one round trip"""
+    return await page.evaluate(PROFILE_INFO_JS, [BIO_SELECTOR, LINK_SELECTOR, MORE_BUTTON_SELECTOR])
+
 async def get_all_profiles():
     """Get all profiles from the database"""
     try:
@@ -106,14 +131,16 @@ async def update_profile_last_seen(profile_id, shortcode):
         print(f"❌ Error updating profile: {e}")
         return None
 
-async def check_post_exists(shortcode):
-    """Check if post already exists in database"""
+async def get_existing_shortcodes(username_id):
+    """Get the shortcodes of every post already saved for a profile"""
     try:
-        result = supabase.table('posts').select('*').eq('shortcode', shortcode).execute()
-        return len(result.data) > 0
+        result = await asyncio.to_thread(
+            supabase.table('posts').select('shortcode').eq('username_id', username_id).execute
+        )
+        return {row['shortcode'] for row in result.data}
     except Exception as e:
-        print(f"❌ Error checking post existence: {e}")
-        return False
+        print(f"❌ Error fetching existing posts: {e}")
+        return set()
 
 async def should_stop_scraping(shortcode, last_seen_shortcode):
     """Check if we should stop scraping based on last seen shortcode"""
@@ -132,27 +159,24 @@ async def create_post_record(shortcode, username_id, post_date, caption_path=Non
             'processed': False
         }
         
-        result = supabase.table('posts').insert(new_post).execute()
+        result = await asyncio.to_thread(supabase.table('posts').insert(new_post).execute)
         return result.data[0] if result.data else None
         
     except Exception as e:
         print(f"❌ Error creating post record: {e}")
         return None
 
-async def create_image_record(post_id, file_path):
-    """Create image record in post_images table"""
+async def create_image_records_bulk(rows):
+    """Create all of a post's post_images rows in one insert"""
+    if not rows:
+        return []
     try:
-        new_image = {
-            'post_id': post_id,
-            'file_path': file_path
-        }
-        
-        result = supabase.table('post_images').insert(new_image).execute()
-        return result.data[0] if result.data else None
+        result = await asyncio.to_thread(supabase.table('post_images').insert(rows).execute)
+        return result.data or []
         
     except Exception as e:
-        print(f"❌ Error creating image record: {e}")
-        return None
+        print(f"❌ Error creating image records: {e}")
+        return []
 
 async def upload_to_supabase(data, filepath, bucket_name, content_type="image/jpeg"):
     """Upload data to Supabase storage bucket"""
@@ -162,7 +186,9 @@ async def upload_to_supabase(data, filepath, bucket_name, content_type="image/jp
             data = data.encode('utf-8')
             content_type = "text/plain"
         
-        result = supabase.storage.from_(bucket_name).upload(
+        # The client is blocking; run it in a thread so concurrent uploads overlap
+        result = await asyncio.to_thread(
+            supabase.storage.from_(bucket_name).upload,
             filepath, 
             data,
             file_options={"content-type": content_type}
@@ -184,18 +210,49 @@ async def scrape_profile(profile, context):
     
     try:
         page = await context.new_page()
-        await page.goto(f"https://www.instagram.com/{username}/", timeout=60000)
+        # List the profile's storage folders and saved posts while the page loads
+        listings = asyncio.gather(
+            list_storage_folder("instagram-profile-pics", username),
+            list_storage_folder("instagram-bios", username),
+            get_existing_shortcodes(username_id),
+        )
+        try:
+            await page.goto(f"https://www.instagram.com/{username}/", timeout=60000)
+        except BaseException:
+            # Don't leave the listings running (or their results unretrieved) when the page load fails
+            listings.cancel()
+            await asyncio.gather(listings, return_exceptions=True)
+            raise
+        profile_pic_files, bio_files, existing_shortcodes = await listings
+
+        # Read profile picture URL, bio and link in one call (only if something is missing from storage)
+        profile_pic_path = f"{username}/{username}_profile.jpg"
+        bio_path = f"{username}/{username}_bio.txt"
+        needs_pic = os.path.basename(profile_pic_path) not in profile_pic_files
+        needs_bio = os.path.basename(bio_path) not in bio_files
+        info = {}
+        if needs_pic or needs_bio:
+            try:
+                # goto returns on commit; wait for the header to render before reading it
+                await page.wait_for_selector('header img', timeout=10000)
+                info = await read_profile_info(page)
+                # Truncated bio: click "more" and read again
+                if needs_bio and info['has_more']:
+                    await page.locator(f'{MORE_BUTTON_SELECTOR}:has-text("more")').first.click()
+                    await page.wait_for_timeout(1000)
+                    print(f"Clicked 'more' button for {username}")
+                    info = await read_profile_info(page)
+            except Exception as e:
+                print(f"❌ Error reading profile info for {username}: {e}")
 
         # Check and save profile picture to Supabase if it doesn't exist
         print(f"Checking profile picture for {username}...")
         try:
-            profile_pic_path = f"{username}/{username}_profile.jpg"
-            
             # Check if profile picture already exists
-            if await file_exists_in_storage(profile_pic_path, "instagram-profile-pics"):
+            if not needs_pic:
                 print(f"⏭️  Profile picture already exists for {username}, skipping download")
             else:
-                pic_url = await page.locator("header img").first.get_attribute("src")
+                pic_url = info.get('pic_url')
                 if pic_url:
                     image_response = await context.request.get(pic_url)
                     profile_data = await image_response.body()
@@ -210,48 +267,17 @@ async def scrape_profile(profile, context):
         # Check and save bio to Supabase if it doesn't exist
         print(f"Checking bio for {username}...")
         try:
-            bio_path = f"{username}/{username}_bio.txt"
-            
             # Check if bio already exists
-            if await file_exists_in_storage(bio_path, "instagram-bios"):
+            if not needs_bio:
                 print(f"⏭️  Bio already exists for {username}, skipping download")
             else:
-                # First, check for and click "more" button if it exists
-                try:
-                    more_button = page.locator('span.x1lliihq.x1plvlek.xryxfnj.x1n2onr6.x1ji0vk5.x18bv5gf.x193iq5w.xeuugli.x1fj9vlw.x13faqbe.x1vvkbs.x1s928wv.xhkezso.x1gmr53x.x1cpjm7i.x1fgarty.x1943h6x.x1i0vuye.xvs91rp.xo1l8bm.x1roi4f4.x1yc453h.x10wh9bi.xpm28yp.x8viiok.x1o7cslx:has-text("more")')
-                    if await more_button.count() > 0:
-                        await more_button.click()
-                        await page.wait_for_timeout(1000)
-                        print(f"Clicked 'more' button for {username}")
-                except Exception:
-                    pass
-                
-                # Extract bio text using specific selector
-                bio_text = None
-                try:
-                    bio_span = page.locator('span._ap3a._aaco._aacu._aacx._aad7._aade')
-                    if await bio_span.count() > 0:
-                        bio_text = await bio_span.first.inner_text()
-                        if bio_text:
-                            bio_text = bio_text.strip()
-                except Exception:
-                    pass
-                
-                # Extract link if it exists
-                link_text = None
-                try:
-                    link_div = page.locator('div._ap3a._aaco._aacw._aacz._aada._aade')
-                    if await link_div.count() > 0:
-                        link_text = await link_div.first.inner_text()
-                        if link_text:
-                            link_text = link_text.strip()
-                            # Combine bio and link
-                            if bio_text and link_text:
-                                bio_text = f"{bio_text}\n\nLink: {link_text}"
-                            elif link_text and not bio_text:
-                                bio_text = f"Link: {link_text}"
-                except Exception:
-                    pass
+                bio_text = info.get('bio_text')
+                link_text = info.get('link_text')
+                # Combine bio and link
+                if bio_text and link_text:
+                    bio_text = f"{bio_text}\n\nLink: {link_text}"
+                elif link_text and not bio_text:
+                    bio_text = f"Link: {link_text}"
                 
                 if bio_text:
                     # Upload bio to storage
@@ -259,10 +285,10 @@ async def scrape_profile(profile, context):
                     
                     # Update profiles table with bio_file_path
                     try:
-                        result = supabase.table('profiles').update({
+                        result = await asyncio.to_thread(supabase.table('profiles').update({
                             'bio_file_path': bio_path,
                             'last_updated': datetime.now(timezone.utc).isoformat()
-                        }).eq('id', username_id).execute()
+                        }).eq('id', username_id).execute)
                         
                         if result.data:
                             print(f"✅ Bio uploaded and profile updated for {username}")
@@ -278,29 +304,21 @@ async def scrape_profile(profile, context):
         except Exception as e:
             print(f"❌ Error handling bio for {username}: {e}")
 
-        # Wait for posts grid to load with polling
+        # Wait for posts grid to load
         print(f"Waiting for posts grid to load for {username}...")
-        post_count = 0
-        max_attempts = 15
-        
-        for attempt in range(max_attempts):
-            post_count = await page.locator('a[href*="/p/"]').count()
-            if post_count > 0:
-                print(f"Found {post_count} posts for {username}!")
-                break
-            await page.wait_for_timeout(1000)
-        
-        if post_count == 0:
+        post_anchors = page.locator('a[href*="/p/"]')
+        try:
+            await page.wait_for_selector('a[href*="/p/"]', timeout=15000)
+        except Exception:
             print(f"No posts found for {username}")
             await page.close()
             return
         
-        # Extract all post URLs first
-        post_urls = []
-        for i in range(min(20, post_count)):  # Process up to 20 posts
-            post_url = await page.locator('a[href*="/p/"]').nth(i).get_attribute("href")
-            if post_url:
-                post_urls.append(post_url)
+        # Extract all post URLs first, in one call (up to 20 posts)
+        post_urls = await page.eval_on_selector_all(
+            'a[href*="/p/"]',
+            'els => els.slice(0, 20).map(e => e.getAttribute("href"))'
+        )
         
         print(f"Extracted {len(post_urls)} post URLs for {username}")
         
@@ -328,13 +346,13 @@ async def scrape_profile(profile, context):
                 break
             
             # Check if post already exists - if so, skip entire profile since posts are chronological
-            if await check_post_exists(shortcode):
+            if shortcode in existing_shortcodes:
                 print(f"⏭️  Post {shortcode} already exists, skipping entire profile (posts are chronological)...")
                 skip_reason = "duplicate_found"
                 break
             
             # Click the post
-            await page.locator('a[href*="/p/"]').nth(i).click()
+            await post_anchors.nth(i).click()
             await page.wait_for_timeout(2000)
             
             # Find dialog or article
@@ -469,23 +487,36 @@ async def scrape_profile(profile, context):
                 
                 carousel_position += 1
             
-            # Upload images to Supabase and create database records
-            for j, url in enumerate(list(image_urls), 1):
-                try:
+            # Upload images to Supabase, all images at once
+            async def fetch_and_upload(j, url):
+                async with image_transfers:
                     response = await context.request.get(url)
+                    if not response.ok:
+                        raise RuntimeError(f"download failed with HTTP {response.status}")
                     image_data = await response.body()
                     
                     # Use shortcode in filename
                     image_filename = f"{username}/{shortcode}_{j}.jpg"
-                    await upload_to_supabase(image_data, image_filename, "instagram-posts")
-                    
-                    # Create image record in database
-                    await create_image_record(post_id, image_filename)
-                    
-                except Exception as e:
-                    print(f"Failed to upload image {j} for {shortcode}: {e}")
+                    # upload_to_supabase logs and returns None on failure; no post_images row for a missing file
+                    if await upload_to_supabase(image_data, image_filename, "instagram-posts") is None:
+                        raise RuntimeError(f"upload of {image_filename} failed")
+                    return image_filename
+            
+            results = await asyncio.gather(
+                *(fetch_and_upload(j, url) for j, url in enumerate(image_urls, 1)),
+                return_exceptions=True
+            )
+            image_rows = []
+            for j, result in enumerate(results, 1):
+                if isinstance(result, Exception):
+                    print(f"Failed to upload image {j} for {shortcode}: {result}")
+                else:
+                    image_rows.append({'post_id': post_id, 'file_path': result})
+            
+            # Create the image records in database with a single request
+            await create_image_records_bulk(image_rows)
             
-            print(f"Post {shortcode} completed: {len(image_urls)} images uploaded")
+            print(f"Post {shortcode} completed: {len(image_rows)}/{len(image_urls)} images uploaded")
             new_posts_processed += 1
 
             # Close modal and return to grid
@@ -525,22 +556,36 @@ async def main():
     
     async with async_playwright() as p:
         ctx = await p.chromium.launch(headless=True)
-        context = await ctx.new_context(storage_state=STATE)
         
-        print(f"🚀 Starting to process {len(profiles)} profiles...")
+        print(f"🚀 Starting to process {len(profiles)} profiles with {CONCURRENCY} workers...")
         print(f"📅 Only processing posts from the last 1 month...")
         print(f"⚡ Optimized: skipping profiles when old/duplicate posts found...")
         
-        # Process each profile
+        # Workers pull profiles off a shared queue until it's empty
+        queue = asyncio.Queue()
         for i, profile in enumerate(profiles, 1):
-            print(f"\n{'='*50}")
-            print(f"Processing profile {i}/{len(profiles)}: {profile['username']}")
-            print(f"{'='*50}")
-            
-            await scrape_profile(profile, context)
-            
-            # Small delay between profiles
-            await asyncio.sleep(2)
+            queue.put_nowait((i, profile))
+        
+        async def worker():
+            context = await ctx.new_context(storage_state=STATE)
+            try:
+                while True:
+                    try:
+                        i, profile = queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        return
+                    print(f"\n{'='*50}")
+                    print(f"Processing profile {i}/{len(profiles)}: {profile['username']}")
+                    print(f"{'='*50}")
+                    
+                    await scrape_profile(profile, context)
+                    
+                    # Small delay between this worker's profiles
+                    await asyncio.sleep(2)
+            finally:
+                await context.close()
+        
+        await asyncio.gather(*(worker() for _ in range(min(CONCURRENCY, len(profiles)))))
         
         print(f"\n🎉 Script completed! Processed {len(profiles)} profiles.")
 